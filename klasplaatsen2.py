@@ -17,15 +17,105 @@ python klasplaats_generator.py --n 10 --seed 42
 from __future__ import annotations
 
 import argparse
+import functools
+import heapq
 import itertools
+import math
 import random
+import time
 from collections import defaultdict, Counter
-from typing import Dict, List, Sequence, Tuple, Set, Optional
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Protocol, Sequence, Set, Tuple, Union
 
 # ==== Types ================================================================
 Seat = Tuple[int, int, str]  # (row, col, side) – side ∈ {"L", "R"}
 Assignment = Dict[Seat, str]  # seat → leerling
 Candidate = Tuple[Assignment, int, List[str]]  # indeling, score, uitleg
+Plan = bytes  # intern: stoel-id → leerling-id + 1 (0 = lege stoel)
+PairHistory = List[List[int]]  # leerling-id × leerling-id → hoe vaak al buren
+
+
+ProgressCallback = Callable[[int, int, float], None]  # pogingen, geldig, seconden
+
+
+class CancelToken(Protocol):
+    def is_set(self) -> bool: ...
+
+
+class ExactResult(NamedTuple):
+    candidates: List[Candidate]
+    optimal: bool   # True ⇒ zoekboom volledig afgewerkt: dit is de echte top-N
+    nodes: int
+
+
+class RepairResult(NamedTuple):
+    candidate: Candidate
+    moved: List[str]   # wie een andere stoel kreeg (nieuwe leerlingen niet meegeteld)
+    optimal: bool      # True ⇒ bewezen: met minder verplaatsingen kan het niet
+
+
+class BudgetEstimate(NamedTuple):
+    attempts: int            # gekozen aantal herstarts
+    probes: int              # aantal duiken in de schatting
+    tree_size: float         # geschat aantal knopen in de zoekboom van de herstarts
+    plans: float             # geschat aantal verschillende geldige plannen in die boom
+    valid_rate: float        # fractie duiken die zonder terugstappen een geldig plan haalt
+    top_score: Optional[int]     # beste score in de duiken
+    top_rate: float          # fractie duiken op het top-N-niveau
+    hit_rate: float          # kans per herstart waarmee gerekend is (zie estimate_budget)
+    confidence: float
+
+
+class Rotation(NamedTuple):
+    plans: List[Candidate]   # één opstelling per periode
+    history: PairHistory     # burentelling na de laatste periode (voor de volgende reeks)
+
+
+class Apart(NamedTuple):
+    """Harde regel: *a* en *b* zitten in elke opstelling minstens *distance*
+    banken uit elkaar (rijen + kolommen).  1 = niet aan dezelfde bank,
+    2 = ook geen buren (zoals een verboden groep), 3 = één bank ertussen, ..."""
+    a: str
+    b: str
+    distance: int
+
+
+class Together(NamedTuple):
+    """Harde regel: deze leerlingen zitten samen aan één bank."""
+    names: Tuple[str, ...]
+
+
+class Pin(NamedTuple):
+    """Harde regel: *name* zit altijd op *seat* (stoel in het basisgrid)."""
+    name: str
+    seat: Seat
+
+
+# Een harde regel: verboden groep (lijst namen), ``Apart``, ``Together``,
+# ``Pin`` of ``None`` voor "geen gemengde banken".
+Rule = Union[List[str], Apart, Together, Pin, None]
+
+
+class InfeasibleError(RuntimeError):
+    """De harde regels zijn samen onmogelijk.  *conflicts* beschrijft een kleine
+    set regels die op zich al niet kan: laat er één vallen en het bewijs valt weg."""
+
+    def __init__(self, message: str, conflicts: Sequence[str] = ()):
+        super().__init__(message)
+        self.conflicts = list(conflicts)
+
+    def __reduce__(self):
+        return type(self), (str(self), self.conflicts)
+
+# ==== Score-gewichten =======================================================
+BASE_SCORE = 500
+FRONT_BONUS = 200
+BACK_BONUS = 30
+SOLO_BONUS = 100
+EMPTY_PENALTY = 50
+FULL_PENALTY = {1: 100, 2: 200, 3: 400}   # afstand tot front­rij (1=2e rij, ...), daarna ×2 per rij
+REPEAT_PENALTY = 60   # per keer dat twee buren in een vorige periode ook al buren waren
 
 
 # ------------------------------------------------------------
@@ -73,7 +163,432 @@ def build_adjacency(seats: Sequence[Seat]) -> Dict[Seat, Set[Seat]]:
 
 
 # ------------------------------------------------------------
-# 3. Generator
+# 3. Lokalen & gecompileerd constraintmodel (bitmaskers)
+# ------------------------------------------------------------
+# Een lokaal is een basisgrid van banken (rij 0 = achteraan) plus de
+# opstellingen waarin diezelfde banken ook moeten passen.  Een opstelling is
+# een functie (rij, kolom, rijen, kolommen) → (rij, kolom) op bankniveau: de
+# banken zijn fysieke tafels die verschoven worden, de leerlingen blijven aan
+# hun tafel.  Alles wat de zoektocht nodig heeft wordt één keer per lokaal
+# berekend: stoelen en leerlingen krijgen een integer-id en een verzameling
+# stoelen is gewoon een int met één bit per stoel.
+
+BankPos = Tuple[int, int]
+Variant = Callable[[int, int, int, int], BankPos]
+
+
+def same_grid(row: int, col: int, rows: int, cols: int) -> BankPos:
+    return (row, col)
+
+
+def back_row_as_column(row: int, col: int, rows: int, cols: int) -> BankPos:
+    """Achterste rij wordt een extra kolom rechts (zoals ``map_to_layout2``)."""
+    if row == 0:
+        return (col, cols)
+    return (row - 1, col)
+
+
+class RoomLayout(NamedTuple):
+    rows: int = 4
+    cols: int = 3
+    bank_size: int = 2
+    variants: Tuple[Variant, ...] = (same_grid, back_row_as_column)
+
+
+DEFAULT_ROOM = RoomLayout()
+
+
+class CompiledRoom(NamedTuple):
+    seats: List[Seat]                 # stoel-id → stoel in het basisgrid
+    variant_seats: List[List[Seat]]   # per opstelling: stoel-id → stoel
+    conflict_mask: List[int]          # buren in minstens één opstelling
+    bank_mask: List[int]              # stoelen van dezelfde bank (incl. zichzelf)
+    seat_bank: List[int]
+    bank_penalty: List[List[int]]     # per bank, per bezetting: som strafpunten
+    bank_order: List[List[int]]       # per opstelling: banken in (rij, kolom)-volgorde
+    front_seat: List[bool]            # voorste rij in elke opstelling
+    back_seat: List[bool]             # achterste rij in elke opstelling
+    twin_mask: List[int]              # stoelen die overal inwisselbaar zijn met deze (incl. zichzelf)
+    bank_symmetries: List[Tuple[int, ...]]   # bankpermutaties die buren en score bewaren (≠ identiteit)
+    seat_distance: List[List[List[int]]]     # per opstelling: afstand in banken (rij + kolom) tussen stoelen
+
+
+def side_labels(bank_size: int) -> Tuple[str, ...]:
+    return ("L", "R") if bank_size == 2 else tuple("ABCDEFGH"[:bank_size])
+
+
+def full_penalty(dist: int) -> int:
+    """Strafpunten voor een volle bank op *dist* rijen van het bord."""
+    top = max(FULL_PENALTY)
+    return FULL_PENALTY.get(dist, FULL_PENALTY[top] * 2 ** (dist - top))
+
+
+def iter_bits(mask: int) -> Iterator[int]:
+    """Geef de indices van alle gezette bits in *mask*, laagste eerst."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+@functools.lru_cache(maxsize=None)
+def compile_room(room: RoomLayout) -> CompiledRoom:
+    sides = side_labels(room.bank_size)
+    banks = [(r, c) for r in range(room.rows) for c in range(room.cols)]
+    seats = [(r, c, side) for r, c in banks for side in sides]
+    seat_bank = [i // room.bank_size for i in range(len(seats))]
+    bank_seats = [((1 << room.bank_size) - 1) << (b * room.bank_size) for b in range(len(banks))]
+
+    positions = []        # per opstelling: bank → (rij, kolom)
+    for variant in room.variants:
+        pos = [variant(r, c, room.rows, room.cols) for r, c in banks]
+        if len(set(pos)) != len(pos):
+            raise ValueError(f"Opstelling {variant.__name__} zet twee banken op dezelfde plaats.")
+        positions.append(pos)
+
+    # burengraaf op bankniveau, unie over alle opstellingen
+    bank_conflict = list(bank_seats)
+    for pos in positions:
+        at = {p: b for b, p in enumerate(pos)}
+        for b, (r, c) in enumerate(pos):
+            for p in neighbouring_banks(r, c):
+                if p in at:
+                    bank_conflict[b] |= bank_seats[at[p]]
+
+    bank_penalty = []
+    front_bank = [True] * len(banks)
+    back_bank = [True] * len(banks)
+    for pos in positions:
+        front_row = max(r for r, _ in pos)
+        for b, (r, _) in enumerate(pos):
+            front_bank[b] = front_bank[b] and r == front_row
+            back_bank[b] = back_bank[b] and r == 0
+    for b in range(len(banks)):
+        penalty = [0] * (room.bank_size + 1)
+        for pos in positions:
+            dist = max(r for r, _ in pos) - pos[b][0]
+            penalty[0] -= EMPTY_PENALTY
+            if dist > 0:
+                penalty[room.bank_size] -= full_penalty(dist)
+        bank_penalty.append(penalty)
+
+    conflict_mask = [bank_conflict[seat_bank[i]] & ~(1 << i) for i in range(len(seats))]
+    # tweelingen: zelfde bank, zelfde buren en zelfde scoretermen ⇒ inwisselbaar
+    profile = [(conflict_mask[i] | 1 << i, seat_bank[i]) for i in range(len(seats))]
+    twin_mask = [sum(1 << j for j in range(len(seats)) if profile[j] == profile[i]) for i in range(len(seats))]
+
+    return CompiledRoom(
+        seats=seats,
+        variant_seats=[[(*pos[seat_bank[i]], seat[2]) for i, seat in enumerate(seats)]
+                       for pos in positions],
+        conflict_mask=conflict_mask,
+        bank_mask=[bank_seats[b] for b in seat_bank],
+        seat_bank=seat_bank,
+        bank_penalty=bank_penalty,
+        bank_order=[sorted(range(len(banks)), key=pos.__getitem__) for pos in positions],
+        front_seat=[front_bank[b] for b in seat_bank],
+        back_seat=[back_bank[b] for b in seat_bank],
+        twin_mask=twin_mask,
+        bank_symmetries=_bank_symmetries(
+            [bank_conflict[b] & ~bank_seats[b] for b in range(len(banks))],
+            [(tuple(p), f, k) for p, f, k in zip(bank_penalty, front_bank, back_bank)],
+            room.bank_size),
+        seat_distance=[[[abs(pos[b][0] - pos[d][0]) + abs(pos[b][1] - pos[d][1]) for d in seat_bank]
+                        for b in seat_bank] for pos in positions],
+    )
+
+
+def _bank_symmetries(conflict: Sequence[int], attrs: Sequence[Tuple], bank_size: int) -> List[Tuple[int, ...]]:
+    """Alle automorfismen van de burengraaf op bankniveau die ook de scoretermen
+    (strafpunten, front, back) bewaren, behalve de identiteit.  Backtracking:
+    bank b krijgt beeld t als de attributen kloppen en de buren met de reeds
+    afgebeelde banken overeenkomen."""
+    n = len(conflict)
+    nbrs = [{s // bank_size for s in iter_bits(m)} for m in conflict]
+    found: List[Tuple[int, ...]] = []
+    image: List[int] = []
+
+    def extend() -> None:
+        b = len(image)
+        if b == n:
+            if image != list(range(n)):
+                found.append(tuple(image))
+            return
+        for t in range(n):
+            if t in image or attrs[t] != attrs[b]:
+                continue
+            if all((a in nbrs[b]) == (image[a] in nbrs[t]) for a in range(b)):
+                image.append(t)
+                extend()
+                image.pop()
+
+    extend()
+    return found
+
+
+@functools.lru_cache(maxsize=None)
+def independence_number(room: RoomLayout) -> int:
+    """Hoeveel leerlingen hoogstens zonder één enkele buur kunnen zitten (in
+    geen enkele opstelling).  Een bank is een kliek, dus dit is de grootste
+    onafhankelijke verzameling van de burengraaf op bankniveau."""
+    compiled = compile_room(room)
+    first = [compiled.seat_bank.index(b) for b in range(len(compiled.bank_penalty))]
+    # bankburen als bitmasker over banken
+    nbrs = [sum(1 << b for b in set(compiled.seat_bank[s] for s in iter_bits(compiled.conflict_mask[f])))
+            for f in first]
+    memo: Dict[int, int] = {}
+
+    def alpha(mask: int) -> int:
+        if not mask:
+            return 0
+        if mask not in memo:
+            v = (mask & -mask).bit_length() - 1
+            rest = mask & ~(1 << v)
+            memo[mask] = max(1 + alpha(rest & ~nbrs[v]), alpha(rest)) if rest & nbrs[v] else 1 + alpha(rest)
+        return memo[mask]
+
+    return alpha((1 << len(first)) - 1)
+
+
+def _max_clique(adjacency: Sequence[int], candidates: int) -> int:
+    """Grootste kliek (als bitmasker) binnen *candidates*; eenvoudige branch-and-bound."""
+    best = 0
+
+    def extend(clique: int, pool: int) -> None:
+        nonlocal best
+        if not pool:
+            if clique.bit_count() > best.bit_count():
+                best = clique
+            return
+        while pool and clique.bit_count() + pool.bit_count() > best.bit_count():
+            v = (pool & -pool).bit_length() - 1
+            pool &= ~(1 << v)
+            extend(clique | 1 << v, pool & adjacency[v])
+
+    extend(0, candidates)
+    return best
+
+
+# ------------------------------------------------------------
+# 4. Incrementele score (bankbezetting)
+# ------------------------------------------------------------
+# De banken zijn fysieke tafels: een bank blijft in elke opstelling dezelfde
+# stoelen, enkel op een andere plaats.  Per bank volstaat dus één teller; per
+# opstelling verschilt enkel de afstand tot het bord en dus de strafpunten.
+# Die zitten per bank en per bezetting in ``bank_penalty``.
+
+class ScoreTracker:
+    """Houdt de bezetting per bank en de lopende score bij terwijl stoelen
+    gevuld en vrijgemaakt worden.  ``score`` is op elk moment de waarde die
+    ``SeatingGenerator._evaluate`` voor de huidige (deel)opstelling zou geven.
+
+    Met een burengeschiedenis (rotatie) kost elke buur die al eerder naast
+    de leerling zat ``repeat_cost``.  ``pressure[s][i]`` is wat leerling *i*
+    op stoel *s* nu zou kosten; die rij wordt bij elke zet bijgewerkt, zodat
+    ``gain`` niet telkens de buren moet aflopen."""
+
+    def __init__(self, gen: "SeatingGenerator"):
+        self.seat_bank = gen.seat_bank
+        self.seat_bonus = gen.seat_bonus
+        self.bank_penalty = gen.bank_penalty
+        self.is_solo = gen.is_solo
+        n_banks = len(gen.bank_penalty)
+        self.count = [0] * n_banks
+        self.solo = [0] * n_banks
+        self.score = BASE_SCORE + sum(p[0] for p in gen.bank_penalty)
+        self.repeat_cost = gen.repeat_cost
+        if self.repeat_cost is not None:
+            self.neighbours = gen.neighbour_seats
+            self.pressure = [[0] * len(gen.names) for _ in gen.seats1]
+
+    def _bank_term(self, b: int) -> int:
+        c = self.count[b]
+        return self.bank_penalty[b][c] + (SOLO_BONUS * self.solo[b] if c == 1 else 0)
+
+    def _shift_pressure(self, i: int, s: int, sign: int) -> None:
+        cost, pressure = self.repeat_cost[i], self.pressure
+        for t in self.neighbours[s]:
+            pressure[t] = [p + sign * c for p, c in zip(pressure[t], cost)]
+
+    def add(self, i: int, s: int) -> None:
+        b = self.seat_bank[s]
+        self.score += self.seat_bonus[i][s] - self._bank_term(b)
+        self.count[b] += 1
+        self.solo[b] += self.is_solo[i]
+        self.score += self._bank_term(b)
+        if self.repeat_cost is not None:
+            self.score -= self.pressure[s][i]
+            self._shift_pressure(i, s, 1)
+
+    def remove(self, i: int, s: int) -> None:
+        b = self.seat_bank[s]
+        self.score -= self.seat_bonus[i][s] + self._bank_term(b)
+        self.count[b] -= 1
+        self.solo[b] -= self.is_solo[i]
+        self.score += self._bank_term(b)
+        if self.repeat_cost is not None:
+            self._shift_pressure(i, s, -1)
+            self.score += self.pressure[s][i]
+
+    def gain(self, i: int, s: int) -> int:
+        """Hoeveel de score zou stijgen als leerling *i* op stoel *s* gaat zitten."""
+        b = self.seat_bank[s]
+        c, solo = self.count[b], self.solo[b]
+        penalty = self.bank_penalty[b]
+        before = penalty[c] + (SOLO_BONUS * solo if c == 1 else 0)
+        after = penalty[c + 1] + (SOLO_BONUS * self.is_solo[i] if c == 0 else 0)
+        gain = self.seat_bonus[i][s] + after - before
+        if self.repeat_cost is not None:
+            gain -= self.pressure[s][i]
+        return gain
+
+    def bank_gains(self) -> List[int]:
+        """Wat één extra leerling in elke nog niet volle bank hoogstens
+        oplevert aan bankscore; een lege bank levert ook een tweede plaats op.
+        Per bank dalen die waarden, dus de k grootste zijn samen haalbaar."""
+        gains = []
+        for b, c in enumerate(self.count):
+            penalty = self.bank_penalty[b]
+            lost_solo = SOLO_BONUS * self.solo[b] if c == 1 else 0
+            for k in range(c, len(penalty) - 1):
+                gains.append(penalty[k + 1] - penalty[k] - lost_solo)
+                lost_solo = 0
+        return gains
+
+
+class CandidatePool:
+    """Vaste top-N van opstellingen als min-heap op score.
+
+    Een opstelling komt enkel binnen als ze de huidige slechtste verslaat (of
+    de pool nog niet vol is) en nog niet in de pool zit; dubbels worden
+    herkend aan hun canonieke sleutel.  Bij gelijke score wint wie eerst kwam.
+    De generator bewaart enkel ``Plan``-bytes (sleutel = kandidaat)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._heap: List[Tuple[int, int, Tuple, Candidate]] = []   # (score, -volgnr, key, kandidaat)
+        self._keys: Set[Tuple] = set()
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def worst(self) -> Optional[int]:
+        """Score van de N-de beste, of ``None`` zolang de pool niet vol is."""
+        return self._heap[0][0] if len(self._heap) >= self.size else None
+
+    def admits(self, score: int, key: Tuple) -> bool:
+        if key in self._keys:
+            return False
+        return len(self._heap) < self.size or score > self._heap[0][0]
+
+    def add(self, score: int, key: Tuple, candidate: Candidate) -> bool:
+        if not self.admits(score, key):
+            return False
+        entry = (score, -next(self._counter), key, candidate)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, entry)
+        else:
+            self._keys.discard(heapq.heapreplace(self._heap, entry)[2])
+        self._keys.add(key)
+        return True
+
+    def candidates(self) -> List[Candidate]:
+        """Beste eerst."""
+        return [c for _, c in self.items()]
+
+    def items(self) -> List[Tuple[int, object]]:
+        """(score, kandidaat), beste eerst."""
+        return [(score, c) for score, _, _, c in sorted(self._heap, key=lambda e: (-e[0], -e[1]))]
+
+
+def luby(i: int) -> int:
+    """*i*-de term (vanaf 1) van de Luby-reeks 1, 1, 2, 1, 1, 2, 4, 1, ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while i != (1 << k) - 1:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class _BudgetExhausted(Exception):
+    """Interne stop: het knopenbudget of de tijd van een herstart is op."""
+
+
+class SearchStats:
+    """Tellers van de laatste zoekopdracht, te lezen via ``SeatingGenerator.stats``.
+
+    ``pruned`` telt doodlopende knopen per reden: ``forbidden`` (een domein leeg
+    door een paarregel: verboden buren, ``Apart`` of ``Together``), ``mixed``
+    (leeg door de regel zonder gemengde banken), ``seats`` (te weinig stoelen
+    voor wie overblijft), ``bound`` (afgesneden door branch-and-bound) en
+    ``budget`` (herstart gaf op).  ``trace`` bevat (seconden, beste score) bij
+    elke verbetering."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.elapsed = 0.0
+        self.precheck_time = 0.0
+        self.restarts = 0
+        self.nodes = 0
+        self.backtracks = 0
+        self.pruned: Counter = Counter()
+        self.valid = 0
+        self.moves = 0          # lokaal zoeken: geprobeerde en aanvaarde zetten
+        self.accepted = 0
+        self.eval_time = 0.0    # canoniseren en in de pool steken
+        self.bound: Optional[int] = None    # ``upper_bound()``: de herstartlus stopt als de top-n die haalt
+        self.trace: List[Tuple[float, int]] = []
+
+    @property
+    def best(self) -> Optional[int]:
+        return self.trace[-1][1] if self.trace else None
+
+    @property
+    def time_to_best(self) -> Optional[float]:
+        return self.trace[-1][0] if self.trace else None
+
+    def improved(self, score: int) -> None:
+        self.trace.append((round(time.monotonic() - self.start, 4), score))
+
+    def finish(self) -> None:
+        self.elapsed = time.monotonic() - self.start
+
+    def merge(self, other: "SearchStats") -> None:
+        """Tellers van een werkproces optellen; de sporen samenvoegen op tijd."""
+        for name in ("restarts", "nodes", "backtracks", "valid", "moves", "accepted", "eval_time"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.pruned.update(other.pruned)
+        trace = []
+        for t, score in sorted(self.trace + other.trace):
+            if not trace or score > trace[-1][1]:
+                trace.append((t, score))
+        self.trace = trace
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"seconden": round(self.elapsed, 4), "precheck_s": round(self.precheck_time, 4),
+                "herstarts": self.restarts, "knopen": self.nodes, "terugstappen": self.backtracks,
+                "afgesneden": dict(self.pruned), "geldig": self.valid,
+                "zetten": self.moves, "aanvaard": self.accepted,
+                "evaluatie_s": round(self.eval_time, 4), "beste": self.best, "grens": self.bound,
+                "tijd_tot_beste_s": self.time_to_best, "verloop": self.trace}
+
+    def summary(self) -> str:
+        rate = self.nodes / self.elapsed if self.elapsed else 0.0
+        pruned = ", ".join(f"{k} {v}" for k, v in self.pruned.most_common()) or "-"
+        moves = f"{self.moves} zetten ({self.accepted} aanvaard); " if self.moves else ""
+        return (f"{self.restarts} herstarts, {self.valid} geldig, {self.nodes} knopen ({rate:.0f}/s), "
+                f"{self.backtracks} terugstappen; afgesneden: {pruned}; {moves}beste {self.best}"
+                f"{'' if self.bound is None else f' (grens {self.bound})'} na "
+                f"{self.time_to_best}s van {self.elapsed:.2f}s")
+
+
+# ------------------------------------------------------------
+# 5. Generator
 # ------------------------------------------------------------
 
 class SeatingGenerator:
@@ -87,9 +602,21 @@ class SeatingGenerator:
                  genders: Optional[Dict[str, str]] = None,
                  avoid_mixed_bank: bool = False,
                  max_attempts: int = 100000,
-                 rng: Optional[random.Random] = None):
-        if len(names) > 24:
-            raise ValueError("Meer dan 24 leerlingen past nooit.")
+                 rng: Optional[random.Random] = None,
+                 time_limit: Optional[float] = None,
+                 node_budget: Optional[int] = None,
+                 room: Optional[RoomLayout] = None,
+                 guided: bool = True,
+                 history: Optional[Sequence[Sequence[int]]] = None,
+                 apart: Sequence[Tuple[str, str, int]] = (),
+                 together: Sequence[Sequence[str]] = (),
+                 pinned: Optional[Dict[str, Seat]] = None):
+        self.room = room or DEFAULT_ROOM
+        compiled = compile_room(self.room)
+        if len(names) > len(compiled.seats):
+            raise ValueError(f"Meer dan {len(compiled.seats)} leerlingen past nooit.")
+        if len(names) > 255:
+            raise ValueError("Hoogstens 255 leerlingen per klas.")   # leerling-id + 1 moet in een byte
         self.names = list(names)
         self.front_pref, self.back_pref = set(front_pref), set(back_pref)
         self.solo_pref = set(solo_pref)
@@ -97,130 +624,1336 @@ class SeatingGenerator:
         self.avoid_mixed_bank = avoid_mixed_bank
         self.max_attempts = max_attempts
         self.rng = rng or random.Random()
+        # tijdslimiet (seconden) per zoekopdracht en basisbudget aan knopen per
+        # herstart; het budget van herstart k is node_budget * luby(k)
+        self.time_limit = time_limit
+        self.node_budget = node_budget
+        # stoelkeuze per leerling op verwachte scorewinst i.p.v. puur willekeurig
+        self.guided = guided
 
+        self.forbidden_groups = [list(g) for g in forbidden_groups]
         self.forbidden_pairs: Set[Tuple[str, str]] = {
             tuple(sorted(p))
             for group in forbidden_groups
             for p in itertools.combinations(group, 2)
         }
+        self.apart = [Apart(*rule) for rule in apart]
+        self.together = [Together(tuple(group)) for group in together]
+
+        # Gecompileerd lokaal: stoelen, buren en scoretabellen
+        self.seats1 = compiled.seats
+        self.variant_seats = compiled.variant_seats
+        # oude namen (van vóór RoomLayout): opstelling 2 en buren per opstelling, zoals build_adjacency
+        second = min(1, len(self.variant_seats) - 1)
+        self.seats2 = self.variant_seats[second]
+        self.adj1, self.adj2 = (
+            {seats[s]: {seats[t] for t, d in enumerate(row) if d <= 1 and t != s} for s, row in enumerate(dist)}
+            for seats, dist in ((self.seats1, compiled.seat_distance[0]),
+                                (self.seats2, compiled.seat_distance[second])))
+        self.conflict_mask = compiled.conflict_mask
+        self.neighbour_seats = [tuple(iter_bits(m)) for m in self.conflict_mask]
+        self.bank_mask = compiled.bank_mask
+        self.seat_bank = compiled.seat_bank
+        self.bank_penalty = compiled.bank_penalty
+        self.bank_order = compiled.bank_order
+        self.front_seat = compiled.front_seat
+        self.back_seat = compiled.back_seat
+        self.seat_distance = compiled.seat_distance
+        # kleinste afstand over alle opstellingen: een afstandsregel moet in elke opstelling kloppen
+        self.min_distance = [[min(ds) for ds in zip(*rows)] for rows in zip(*compiled.seat_distance)]
+        # symmetrie: tweelingstoelen en bankpermutaties (als stoelpermutaties)
+        self.twin_mask = list(compiled.twin_mask)
+        size = self.room.bank_size
+        self.seat_symmetries = [[perm[s // size] * size + s % size for s in range(len(self.seats1))]
+                                for perm in compiled.bank_symmetries]
+        if any(rule.distance > 2 for rule in self.apart):
+            # verder dan buren: enkel symmetrieën die ook alle afstanden bewaren
+            dist = self.min_distance
+            self.seat_symmetries = [perm for perm in self.seat_symmetries
+                                    if all(dist[perm[s]][perm[t]] == dist[s][t]
+                                           for s in range(len(perm)) for t in range(s))]
+
+        # Leerlingen als ids + bitmaskers
+        self.seat_index = {s: i for i, s in enumerate(self.seats1)}
+        self.student_index = {n: i for i, n in enumerate(self.names)}
+        # Paarregels: links[i] = [(k, tabel)], tabel[s] = stoelen die k niet mag als i op s zit.
+        # forbidden_mask = wie geen buren mogen zijn (verboden groepen en Apart vanaf 2).
+        self.forbidden_mask = [0] * len(self.names)
+        n_seats, all_seats = len(self.seats1), (1 << len(self.seats1)) - 1
+        tables: Dict[Tuple[int, int], List[int]] = {}
+
+        def link(a: str, b: str, table: Sequence[int]) -> None:
+            ia, ib = self.student_index.get(a), self.student_index.get(b)
+            if ia is None or ib is None or ia == ib:
+                return
+            for key in ((ia, ib), (ib, ia)):
+                old = tables.setdefault(key, [0] * n_seats)
+                tables[key] = [x | y for x, y in zip(old, table)]
+
+        for a, b in self.forbidden_pairs:
+            link(a, b, self.conflict_mask)
+        for a, b, distance in self.apart:
+            link(a, b, self.near_mask(distance))
+        for group in self.together:
+            for a, b in itertools.combinations(group.names, 2):
+                link(a, b, [all_seats & ~self.bank_mask[s] for s in range(n_seats)])
+        self.links: List[List[Tuple[int, List[int]]]] = [[] for _ in self.names]
+        for (ia, ib), table in sorted(tables.items()):
+            self.links[ia].append((ib, table))
+            if all(table[s] & self.conflict_mask[s] == self.conflict_mask[s] for s in range(n_seats)):
+                self.forbidden_mask[ia] |= 1 << ib
+        gender_ids: Dict[Optional[str], int] = {}
+        self.gender_id = [gender_ids.setdefault(self.genders.get(n), len(gender_ids))
+                          for n in self.names]
+        self.n_genders = len(gender_ids)
+
+        # Vaste plaatsen: leerling-id → stoel-id
+        self.pins = [Pin(name, tuple(seat)) for name, seat in (pinned or {}).items()]
+        self.pinned: Dict[int, int] = {}
+        for name, seat in self.pins:
+            if name not in self.student_index:
+                raise ValueError(f"{name} zit niet in de klas en kan geen vaste plaats krijgen.")
+            if seat not in self.seat_index:
+                raise ValueError(f"Stoel {seat} bestaat niet in dit lokaal.")
+            if self.seat_index[seat] in self.pinned.values():
+                raise ValueError(f"Twee leerlingen vast op stoel {seat}.")
+            self.pinned[self.student_index[name]] = self.seat_index[seat]
+        pinned_seats = sum(1 << s for s in self.pinned.values())
+        if pinned_seats:
+            # een vaste stoel is geen tweeling meer, en een bankpermutatie moet hem laten staan
+            self.twin_mask = [1 << s if pinned_seats >> s & 1 else m & ~pinned_seats
+                              for s, m in enumerate(self.twin_mask)]
+            self.seat_symmetries = [perm for perm in self.seat_symmetries
+                                    if all(perm[s] == s for s in self.pinned.values())]
+        self.seat_blocked = self._propagate()
+
+        # Scoretabellen per leerling
+        self.is_solo = [int(n in self.solo_pref) for n in self.names]
+        self.seat_bonus = [
+            [(FRONT_BONUS if n in self.front_pref and front else 0)
+             + (BACK_BONUS if n in self.back_pref and back else 0)
+             for front, back in zip(self.front_seat, self.back_seat)]
+            for n in self.names
+        ]
+        # leerlingen met voorkeuren eerst: zo krijgen zij hun plaats voor die volzet is
+        self.pref_rank = [0 if any(bonus) or solo else 1 for bonus, solo in zip(self.seat_bonus, self.is_solo)]
+        self._precheck_warnings: Optional[List[str]] = None
+        self._upper_bound: Optional[int] = None
+        self.stats = SearchStats()
+        self.set_history(history)
 
-        # Precompute seats & adjacency
-        self.seats1 = build_seats_layout1()
-        self.seats2 = build_seats_layout2(self.seats1)
-        self.adj1 = build_adjacency(self.seats1)
-        self.adj2 = build_adjacency(self.seats2)
+    def set_history(self, history: Optional[Sequence[Sequence[int]]]) -> None:
+        """Burentelling uit vorige periodes (``PairHistory``, volgorde van ``names``);
+        elk herhaald buurpaar kost dan ``REPEAT_PENALTY`` per keer.  ``None`` = geen."""
+        if history is not None and (len(history) != len(self.names)
+                                    or any(len(row) != len(self.names) for row in history)):
+            raise ValueError(f"Burengeschiedenis moet {len(self.names)}×{len(self.names)} zijn.")
+        self.history: Optional[PairHistory] = None if history is None else [list(row) for row in history]
+        self.repeat_cost = None if history is None else \
+            [[REPEAT_PENALTY * c for c in row] for row in history]
+
+    def _propagate(self) -> List[int]:
+        """Per leerling de stoelen die vóór het zoeken al uitgesloten zijn.
+
+        Vaste plaatsen eerst: de vaste stoel is voor de anderen weg, en de
+        paarregels (en "geen gemengde banken") van wie vast zit gelden meteen
+        voor zijn partners.  Daarna tot er niets meer verandert: een stoel
+        valt weg als een partner dan geen enkele toegelaten stoel overhoudt."""
+        n, n_seats = len(self.names), len(self.seats1)
+        all_seats = (1 << n_seats) - 1
+        blocked = [0] * n
+        pinned_seats = sum(1 << s for s in self.pinned.values())
+        for i in range(n):
+            blocked[i] = all_seats & ~(1 << self.pinned[i]) if i in self.pinned else pinned_seats
+        for i, s in self.pinned.items():
+            for k, table in self.links[i]:
+                blocked[k] |= table[s]
+            if self.avoid_mixed_bank:
+                for k in range(n):
+                    if self.gender_id[k] != self.gender_id[i]:
+                        blocked[k] |= self.bank_mask[s] & ~(1 << s)
+        changed = True
+        while changed:
+            changed = False
+            for i, links in enumerate(self.links):
+                for k, table in links:
+                    allowed = all_seats & ~blocked[k]
+                    for s in iter_bits(all_seats & ~blocked[i]):
+                        if not allowed & ~table[s] & ~(1 << s):
+                            blocked[i] |= 1 << s
+                            changed = True
+        return blocked
+
+    def near_mask(self, distance: int) -> List[int]:
+        """Per stoel: de andere stoelen op minder dan *distance* banken, in
+        minstens één opstelling.  ``near_mask(2) == conflict_mask``."""
+        return [sum(1 << t for t, d in enumerate(row) if d < distance and t != s)
+                for s, row in enumerate(self.min_distance)]
+
+    def neighbour_pairs(self, owner: Sequence[int]) -> Iterator[Tuple[int, int]]:
+        """Alle paren (i, j), i < j, die in minstens één opstelling buren zijn."""
+        for s, i in enumerate(owner):
+            if i < 0:
+                continue
+            for t in iter_bits(self.conflict_mask[s] >> s + 1 << s + 1):
+                j = owner[t]
+                if j >= 0:
+                    yield (i, j) if i < j else (j, i)
 
     # ---------- helpers ----------
     def _are_adjacent(self, a: Seat, b: Seat) -> bool:
-        if b in self.adj1[a]:
-            return True
-        return map_to_layout2(b) in self.adj2[map_to_layout2(a)]
+        return bool(self.conflict_mask[self.seat_index[a]] >> self.seat_index[b] & 1)
+
+    def _start_run(self, *, check: bool = True) -> SearchStats:
+        """Nieuwe ``stats`` voor een zoekopdracht; met *check* meteen ``precheck()``."""
+        stats = self.stats = SearchStats()
+        if check:
+            start = time.perf_counter()
+            self.precheck()
+            stats.precheck_time = time.perf_counter() - start
+        return stats
 
     # ---------- scoring & uitleg ----------
     def _evaluate(self, assignment: Assignment) -> Tuple[int, List[str]]:
-        score, missing = 500, []
+        owner = [-1] * len(self.seats1)
+        tracker = ScoreTracker(self)
+        for seat, name in assignment.items():
+            s, i = self.seat_index[seat], self.student_index[name]
+            owner[s] = i
+            tracker.add(i, s)
+        return tracker.score, self._missing(owner, tracker)
+
+    def variant_assignment(self, assignment: Assignment, variant: int) -> Assignment:
+        """Dezelfde indeling, met de stoelen zoals ze in opstelling *variant* staan."""
+        seats = self.variant_seats[variant]
+        return {seats[self.seat_index[s]]: n for s, n in assignment.items()}
+
+    def plan_key(self, assignment: Assignment) -> Plan:
+        """Canonieke sleutel van een opstelling: gelijk voor opstellingen die
+        enkel op een symmetrie van het lokaal na verschillen."""
+        return self._canonical(self._owner(assignment))
 
-        # ---------------- per-leerling ­scores ----------------
+    def _owner(self, assignment: Assignment) -> List[int]:
+        """Indeling → stoel-id → leerling-id (-1 = leeg)."""
+        owner = [-1] * len(self.seats1)
         for seat, name in assignment.items():
-            row1 = seat[0]                     # 4×3-lay-out
-            row2 = map_to_layout2(seat)[0]     # 3×4-lay-out
-
-            if name in self.front_pref:
-                (row1 == 3 and row2 == 2) or missing.append(f"{name} niet vooraan")
-                score += 200 if (row1 == 3 and row2 == 2) else 0
-
-            if name in self.back_pref:
-                (row1 == 0 and row2 == 0) or missing.append(f"{name} niet achteraan")
-                score += 30 if (row1 == 0 and row2 == 0) else 0
-
-            if name in self.solo_pref:
-                mates = [n for s, n in assignment.items() if s[:2] == seat[:2] and s != seat]
-                (not mates) or missing.append(f"{name} niet alleen")
-                score += 100 if not mates else 0
-
-        # ---------------- bank-analyses beide lay-outs ----------------
-        EMPTY_PENALTY = 50
-        FULL_PENALTY = {1: 100, 2: 200, 3: 400}   # afstand tot front­rij (1=2e rij, ...)
-
-        # ---- lay-out 1: 4×3 ------------------------------
-        for r in range(4):
-            for c in range(3):
-                seats_here = [s for s in assignment if s[:2] == (r, c)]
-                dist = 3 - r                     # 0 = voorste rij
-                if not seats_here:
-                    score -= EMPTY_PENALTY
-                    missing.append(f"Er is een lege bank (dus geen optimale bezetting)")
-                elif len(seats_here) == 2 and dist > 0:
-                    penalty = FULL_PENALTY[dist]           # dist is nu 1–3
-                    score -= penalty
-
-
-        # ---- lay-out 2: 3×4 ------------------------------
-        for r in range(3):
-            for c in range(4):
-                seats_here = [s for s in assignment if map_to_layout2(s)[:2] == (r, c)]
-                dist = 2 - r                     # 0 = voorste rij
-                if not seats_here:
-                    score -= EMPTY_PENALTY
-                    missing.append(f"Er is een lege bank (dus geen optimale bezetting)")
-                elif len(seats_here) == 2 and dist > 0:
-                    penalty = FULL_PENALTY[dist]           # dist is nu 1–2
-                    score -= penalty
+            owner[self.seat_index[seat]] = self.student_index[name]
+        return owner
 
+    def _canonical(self, owner: Sequence[int]) -> Plan:
+        """Vertegenwoordiger van de symmetrieklasse van *owner*.
 
-        return score, missing
+        Binnen elke groep tweelingstoelen zitten de bewoners gesorteerd (laagste
+        leerling-id op de laagste stoel, lege stoelen achteraan); daarna de
+        kleinste van alle beelden onder ``seat_symmetries``.  Score, uitleg en
+        geldigheid veranderen niet."""
+        best: Optional[List[int]] = None
+        for perm in [None, *self.seat_symmetries]:
+            image = list(owner) if perm is None else [-1] * len(owner)
+            if perm is not None:
+                for s, i in enumerate(owner):
+                    image[perm[s]] = i
+            done = 0
+            for s in range(len(image)):
+                twins = self.twin_mask[s]
+                if done >> s & 1 or twins == 1 << s:
+                    continue
+                done |= twins
+                seats = list(iter_bits(twins))
+                occupants = sorted(image[t] for t in seats if image[t] >= 0)
+                occupants += [-1] * (len(seats) - len(occupants))
+                for t, i in zip(seats, occupants):
+                    image[t] = i
+            if best is None or image < best:
+                best = image
+        return bytes(i + 1 for i in best)
 
+    def _offer(self, pool: CandidatePool, owner: Sequence[int], tracker: ScoreTracker) -> bool:
+        """Bied een opstelling aan *pool* aan als canoniek ``Plan``; de sleutel
+        wordt pas berekend als de score binnen kan."""
+        score, worst = tracker.score, pool.worst()
+        if worst is not None and score <= worst:
+            return False
+        stats = self.stats
+        start = time.perf_counter()
+        plan = self._canonical(owner)
+        added = pool.add(score, plan, plan)
+        stats.eval_time += time.perf_counter() - start
+        if stats.best is None or score > stats.best:
+            stats.improved(score)
+        return added
 
+    def _candidate(self, plan: Plan) -> Candidate:
+        """``Plan`` → (indeling, score, uitleg): enkel aan de rand van de API."""
+        owner = [b - 1 for b in plan]
+        tracker = ScoreTracker(self)
+        for s, i in enumerate(owner):
+            if i >= 0:
+                tracker.add(i, s)
+        assign = {self.seats1[s]: self.names[i] for s, i in enumerate(owner) if i >= 0}
+        return assign, tracker.score, self._missing(owner, tracker)
 
+    def _candidates(self, pool: CandidatePool) -> List[Candidate]:
+        return [self._candidate(plan) for plan in pool.candidates()]
+
+    def _seed_pool(self, pool: CandidatePool, start: Sequence[Candidate]) -> None:
+        """Steek eerder gevonden opstellingen (bv. uit een cache) in *pool*;
+        de score wordt opnieuw berekend, de meegegeven score telt niet.
+        Opstellingen die niet meer passen (onbekende naam of stoel, niet
+        iedereen geplaatst, of een harde regel gebroken) vallen weg: de
+        cachesleutel dekt niet elke regel."""
+        for assign, _, _ in start:
+            if set(assign.values()) != set(self.names) or len(assign) != len(self.names) \
+                    or not all(seat in self.seat_index for seat in assign):
+                continue
+            owner = self._owner(assign)
+            seat_of = [0] * len(self.names)
+            for s, i in enumerate(owner):
+                if i >= 0:
+                    seat_of[i] = s
+            occupied = sum(1 << s for s, i in enumerate(owner) if i >= 0)
+            if not all(self._fits(i, s, seat_of, owner, occupied) for i, s in enumerate(seat_of)):
+                continue
+            tracker = ScoreTracker(self)
+            for s, i in enumerate(owner):
+                if i >= 0:
+                    tracker.add(i, s)
+            self._offer(pool, owner, tracker)
+
+    def _missing(self, owner: Sequence[int], tracker: ScoreTracker) -> List[str]:
+        """Uitleg bij de score: welke voorkeuren niet gehaald zijn."""
+        missing = []
+        seat_of = {i: s for s, i in enumerate(owner) if i >= 0}
+        for i, name in enumerate(self.names):
+            s = seat_of.get(i)
+            if s is None:
+                continue
+            if name in self.front_pref and not self.front_seat[s]:
+                missing.append(f"{name} niet vooraan")
+            if name in self.back_pref and not self.back_seat[s]:
+                missing.append(f"{name} niet achteraan")
+            if name in self.solo_pref and tracker.count[self.seat_bank[s]] > 1:
+                missing.append(f"{name} niet alleen")
+        # lege banken, per opstelling
+        for banks in self.bank_order:
+            for b in banks:
+                if not tracker.count[b]:
+                    missing.append(f"Er is een lege bank (dus geen optimale bezetting)")
+        if self.history is not None:
+            for i, j in self.neighbour_pairs(owner):
+                if self.history[i][j]:
+                    missing.append(f"{self.names[i]} en {self.names[j]} opnieuw buren "
+                                   f"(al {self.history[i][j]}×)")
+        return missing
 
     # ---------- core backtracking ----------
     def _place_recursive(self, idx: int, seats: List[Seat], assign: Assignment) -> bool:
-        if idx == len(self.names):
+        """Plaats alle leerlingen die nog niet in *assign* zitten, met *seats*
+        als volgorde waarin stoelen geprobeerd worden.
+
+        Werkt intern op stoel-/leerling-ids: *assign* wordt enkel aangevuld
+        wanneer een volledige geldige opstelling gevonden is.  *idx* blijft
+        enkel voor compatibiliteit bestaan; de zoekvolgorde kiest zelf."""
+        owner = self._owner(assign)
+        order = [self.seat_index[s] for s in seats]
+        if not self._solve([order] * len(self.names), owner, ScoreTracker(self)):
+            return False
+        for i, student in enumerate(owner):
+            if student >= 0:
+                assign[self.seats1[i]] = self.names[student]
+        return True
+
+    def _solve(self, orders: Sequence[Sequence[int]], owner: List[int], tracker: ScoreTracker, *,
+               on_leaf: Optional[Callable[[], bool]] = None,
+               prune: Optional[Callable[[int, List[int]], bool]] = None,
+               rank: Optional[Sequence[int]] = None,
+               node_limit: Optional[int] = None,
+               deadline: Optional[float] = None,
+               guided: bool = False,
+               stats: Optional[SearchStats] = None,
+               twins: Optional[Sequence[int]] = None,
+               choose: Optional[Callable[[int, int], int]] = None) -> bool:
+        """Backtracking op bitmaskers; vult *owner* (stoel-id → leerling-id, -1 = leeg).
+
+        Per leerling houden we ``blocked`` bij: de stoelen die een paarregel
+        (``links``) met een al geplaatste partner verbiedt, plus vooraf
+        ``seat_blocked``.  Elke regel is een opzoektabel per stoel, dus een
+        plaatsing kost één OR per partner.  Zo kennen we op elk moment het
+        live domein (vrije, toegelaten stoelen) van elke ongeplaatste leerling:
+        we plaatsen telkens de leerling met het kleinste domein en keren meteen
+        terug zodra één domein leeg wordt (forward checking).  *tracker* volgt
+        elke plaatsing, zodat de score na afloop meteen klaarstaat.
+
+        *orders[i]* is de volgorde waarin stoelen voor leerling *i* geprobeerd
+        worden.  Zonder *on_leaf* stopt de zoektocht bij de eerste volledige
+        opstelling; anders wordt *on_leaf* bij elke opstelling opgeroepen en
+        stopt de zoektocht pas wanneer die ``True`` geeft.  *prune(unplaced,
+        domains)* mag een deelboom afsnijden (``True``).  Met *rank* gaan
+        leerlingen met een lagere rang altijd voor, ongeacht hun domein.
+        Na *node_limit* knopen, of na *deadline* (``time.monotonic()``, om de
+        256 knopen gecontroleerd), geeft de zoektocht op (``False``); *owner*
+        en *tracker* blijven dan half gevuld achter.
+
+        Vrije tweelingstoelen (``twin_mask``) zijn op elk moment inwisselbaar:
+        per knoop wordt dus maar één stoel per groep geprobeerd (de eerste in
+        de volgorde).  Zo komt elke verdeling van leerlingen over banken maar
+        één keer in de boom, i.p.v. één keer per verwisseling van zijden.
+        *twins* vervangt ``twin_mask`` (bv. één bit per stoel: geen symmetrie).
+        Met *choose(i, domein)* wordt per knoop enkel die ene stoel geprobeerd,
+        zonder terug te stappen (een duik, zie ``_dive``).
+        Met *stats* worden knopen, terugstappen en doodlopers opgeteld."""
+        n = len(self.names)
+        bank = self.bank_mask
+        links, gender = self.links, self.gender_id
+        twin = self.twin_mask if twins is None else twins
+        avoid_mixed = self.avoid_mixed_bank
+        n_genders = self.n_genders
+        blocked = list(self.seat_blocked)
+        mixed = [0] * n_genders      # per gender: banken met iemand van een ander gender
+        n_seats = len(self.seats1)
+        all_seats = (1 << n_seats) - 1
+        occupied = 0
+        unplaced = (1 << n) - 1
+        domains = [0] * n
+        # rang als offset bij de domeingrootte: (rang, grootte) in één getal
+        offset = [r * (n_seats + 1) for r in rank] if rank is not None else [0] * n
+
+        def occupy(i: int, s: int) -> None:
+            nonlocal occupied, unplaced
+            occupied |= 1 << s
+            unplaced &= ~(1 << i)
+            owner[s] = i
+            tracker.add(i, s)
+            for k, table in links[i]:
+                blocked[k] |= table[s]
+            if avoid_mixed:
+                for g in range(n_genders):
+                    if g != gender[i]:
+                        mixed[g] |= bank[s]
+
+        for s, i in enumerate(owner):
+            if i >= 0:
+                occupy(i, s)
+        for i, s in self.pinned.items():          # vaste plaatsen eerst
+            if owner[s] < 0 and unplaced >> i & 1 and not blocked[i] >> s & 1:
+                occupy(i, s)
+
+        nodes = backtracks = 0
+        dead: Counter = Counter()
+        budget = node_limit if node_limit is not None else -1
+
+        def place() -> bool:
+            nonlocal occupied, unplaced, nodes, backtracks
+            nodes += 1
+            if nodes == budget:
+                raise _BudgetExhausted
+            if deadline is not None and not nodes & 255 and time.monotonic() >= deadline:
+                raise _BudgetExhausted
+            if not unplaced:
+                return on_leaf is None or on_leaf()
+            # most-constrained-first: kies de leerling met het kleinste domein
+            free = all_seats & ~occupied
+            best, best_dom, best_key = -1, 0, 1 << 30
+            union = 0
+            rest = unplaced
+            while rest:
+                low = rest & -rest
+                rest ^= low
+                i = low.bit_length() - 1
+                dom = free & ~blocked[i]
+                if avoid_mixed:
+                    dom &= ~mixed[gender[i]]
+                size = dom.bit_count()
+                if not size:
+                    if stats is not None:
+                        dead["forbidden" if not free & ~blocked[i] else "mixed"] += 1
+                    return False              # forward check: doodlopend
+                if size + offset[i] < best_key:
+                    best, best_dom, best_key = i, dom, size + offset[i]
+                union |= dom
+                domains[i] = dom
+            if union.bit_count() < unplaced.bit_count():
+                dead["seats"] += 1
+                return False                  # te weinig stoelen voor wie overblijft
+            if prune is not None and prune(unplaced, domains):
+                dead["bound"] += 1
+                return False
+            i, dom = best, best_dom
+            candidates = orders[i]
+            if choose is not None:
+                candidates = (choose(i, dom),)
+            elif guided:
+                # stabiel sorteren: bij gelijke winst beslist de (geschudde) volgorde
+                gain = tracker.gain
+                candidates = sorted([s for s in candidates if dom >> s & 1], key=lambda s: -gain(i, s))
+            for s in candidates:
+                if not dom >> s & 1:
+                    continue
+                dom &= ~twin[s]              # de andere vrije tweelingen: zelfde deelboom
+                saved_blocked = [blocked[k] for k, _ in links[i]]
+                saved_mixed = mixed.copy()
+                saved_occupied = occupied
+                occupy(i, s)
+                if place():
+                    return True
+                backtracks += 1
+                owner[s] = -1
+                tracker.remove(i, s)
+                occupied, unplaced = saved_occupied, unplaced | (1 << i)
+                for (k, _), old in zip(links[i], saved_blocked):
+                    blocked[k] = old
+                mixed[:] = saved_mixed
+            return False
+
+        try:
+            return place()
+        except _BudgetExhausted:
+            dead["budget"] += 1
+            return False
+        finally:
+            if stats is not None:
+                stats.nodes += nodes
+                stats.backtracks += backtracks
+                stats.pruned.update(dead)
+
+    def _first_plan(self) -> Tuple[List[int], ScoreTracker]:
+        """Eén geldige opstelling via herstarts (startpunt voor lokaal zoeken)."""
+        self.precheck()
+        order = list(range(len(self.seats1)))
+        for attempt in range(1, self.max_attempts + 1):
+            self.stats.restarts += 1
+            self.rng.shuffle(order)
+            owner = [-1] * len(self.seats1)
+            tracker = ScoreTracker(self)
+            budget = self.node_budget * luby(attempt) if self.node_budget else None
+            if self._solve([order] * len(self.names), owner, tracker, node_limit=budget,
+                           stats=self.stats, **self._guidance()):
+                self.stats.valid += 1
+                return owner, tracker
+        raise RuntimeError("Geen enkele geldige opstelling gevonden.")
+
+    def _guidance(self) -> Dict[str, object]:
+        """Waardeordening voor herstarts: per knoop de stoelen met de grootste
+        scorewinst eerst (front/back/solo en bankbezetting, zie ``ScoreTracker.gain``),
+        bij gelijke winst in de geschudde volgorde; voorkeursleerlingen eerst."""
+        return {"guided": True, "rank": self.pref_rank} if self.guided else {}
+
+    def _fits(self, i: int, t: int, seat_of: Sequence[int], owner: Sequence[int],
+              occupied: int, ignore: int = -1) -> bool:
+        """Mag leerling *i* naar stoel *t*?  *ignore* is de leerling met wie *i*
+        eventueel wisselt: die telt niet mee als buur (hij zat al naast *i*)."""
+        if self.seat_blocked[i] >> t & 1:
+            return False                  # vaste plaatsen en wat daaruit volgt
+        for k, table in self.links[i]:
+            if k != ignore and seat_of[k] >= 0 and table[t] >> seat_of[k] & 1:
+                return False
+        if self.avoid_mixed_bank:
+            vacated = (1 << t) | (1 << seat_of[i])
+            for s in iter_bits(self.bank_mask[t] & occupied & ~vacated):
+                if self.gender_id[owner[s]] != self.gender_id[i]:
+                    return False
+        return True
+
+    def _bonus_levels(self) -> List[List[Tuple[int, int]]]:
+        """Per leerling: (bonus, stoelmasker), hoogste bonus eerst."""
+        levels = []
+        for bonus in self.seat_bonus:
+            masks: Dict[int, int] = defaultdict(int)
+            for s, value in enumerate(bonus):
+                masks[value] |= 1 << s
+            levels.append(sorted(masks.items(), reverse=True))
+        return levels
+
+    def _score_bound(self, tracker: ScoreTracker, unplaced: int, domains: Sequence[int],
+                     bonus_levels: Sequence[Sequence[Tuple[int, int]]]) -> int:
+        """Optimistische score van elke afwerking van de huidige deelopstelling:
+        per ongeplaatste leerling de beste front/back-bonus binnen zijn domein,
+        een solobonus als er een lege bank in zijn domein ligt, en de k beste
+        bankwinsten (k = aantal ongeplaatsten)."""
+        empty_seats = 0
+        for s, b in enumerate(self.seat_bank):
+            if not tracker.count[b]:
+                empty_seats |= 1 << s
+        bound = tracker.score
+        for i in iter_bits(unplaced):
+            dom = domains[i]
+            for value, mask in bonus_levels[i]:
+                if dom & mask:
+                    bound += value
+                    break
+            if self.is_solo[i] and dom & empty_seats:
+                bound += SOLO_BONUS
+        gains = sorted(tracker.bank_gains(), reverse=True)
+        return bound + sum(gains[:unplaced.bit_count()])
+
+    def upper_bound(self) -> int:
+        """Hoogst haalbare score voor deze klas in dit lokaal (harde regels en
+        herhaalde buren niet meegerekend).
+
+        Dynamisch programmeren over de banken: elke bank krijgt 0..banklengte
+        leerlingen, waarvan enkele met voorkeuren hun bonus er halen (front,
+        back, alleen).  Toestand = (geplaatst, per soort voorkeur hoeveel al
+        een bonus hebben); wie geen bonus haalt telt als gewone leerling.
+        Strafpunten, front en back zijn per bank al samengevat over beide
+        opstellingen; vaste plaatsen liggen vast in hun bank.  Enkel de
+        andere harde regels maken de echte top dus lager.  Eén keer berekend
+        per generator (hangt niet af van ``history``); werkprocessen erven
+        het resultaat."""
+        if self._upper_bound is not None:
+            return self._upper_bound
+        n, size = len(self.names), self.room.bank_size
+        kinds = Counter((name in self.front_pref, name in self.back_pref, solo)
+                        for i, (name, solo) in enumerate(zip(self.names, self.is_solo))
+                        if i not in self.pinned)
+        kinds.pop((False, False, 0), None)
+        # vaste plaatsen: hun bank telt hen altijd mee, hun bonus ligt vast
+        pins_in = [0] * len(self.bank_penalty)
+        pin_bonus = [0] * len(self.bank_penalty)
+        pin_solo = [0] * len(self.bank_penalty)
+        for i, s in self.pinned.items():
+            b = self.seat_bank[s]
+            pins_in[b] += 1
+            pin_bonus[b] += self.seat_bonus[i][s]
+            pin_solo[b] += self.is_solo[i]
+        kinds_list = list(kinds)
+        limit = [kinds[kind] for kind in kinds_list]
+        capacity = len(self.seats1)
+        best: Dict[Tuple[int, Tuple[int, ...]], int] = {(0, (0,) * len(kinds_list)): 0}
+        for b, penalty in enumerate(self.bank_penalty):
+            seat = self.seat_bank.index(b)
+            front, back = self.front_seat[seat], self.back_seat[seat]
+            capacity -= size
+            # per bezetting c: welke groepjes leerlingen met voorkeur hier een bonus halen
+            choices = []
+            for c in range(size + 1):
+                gain = [FRONT_BONUS * (f and front) + BACK_BONUS * (k and back)
+                        + (SOLO_BONUS * solo if c == 1 else 0) for f, k, solo in kinds_list]
+                useful = [t for t, g in enumerate(gain) if g > 0]
+                fixed = pin_bonus[b] + (SOLO_BONUS * pin_solo[b] if c == 1 else 0)
+                choices.append([(combo, fixed + sum(gain[t] for t in combo))
+                                 for r in range(c - pins_in[b] + 1)
+                                 for combo in itertools.combinations_with_replacement(useful, r)])
+            layer: Dict[Tuple[int, Tuple[int, ...]], int] = {}
+            for (placed, used), value in best.items():
+                for c in range(max(0, n - placed - capacity), min(size, n - placed) + 1):
+                    for combo, gain in choices[c]:
+                        after = list(used)
+                        for t in combo:
+                            after[t] += 1
+                        if any(u > m for u, m in zip(after, limit)):
+                            continue
+                        key = (placed + c, tuple(after))
+                        score = value + penalty[c] + gain
+                        if key not in layer or score > layer[key]:
+                            layer[key] = score
+            best = layer
+        self._upper_bound = BASE_SCORE + max(best.values())
+        return self._upper_bound
+
+    # ---------- haalbaarheid ----------
+    # Een regel (``Rule``) is een verbodsgroep (lijst namen), een ``Apart``, een
+    # ``Together`` of ``None`` voor "geen gemengde banken".
+    def _hard_conflict(self) -> Optional[List[Rule]]:
+        """Goedkope bewijzen dat de harde regels niet kunnen; de betrokken regels of ``None``.
+
+        Wie samen aan één bank moet (ook via via) past niet als dat meer is
+        dan de banklengte.  Leerlingen die elkaar twee aan twee niet mogen
+        zien (een kliek in de verbodsgraaf, bv. één groep) hebben elk een bank
+        zonder buren nodig.  Zonder gemengde banken heeft elk gender minstens
+        zoveel eigen banken nodig als zijn grootste kliek, en minstens
+        ⌈aantal / banklengte⌉."""
+        bank_of: Dict[str, Set[str]] = {}
+        for group in self.together:
+            members = set(group.names).intersection(self.names)
+            for name in list(members):
+                members |= bank_of.get(name, set())
+            for name in members:
+                bank_of[name] = members
+            if len(members) > self.room.bank_size:
+                return [r for r in self.together if set(r.names) & members]
+        everyone = (1 << len(self.names)) - 1
+        clique = _max_clique(self.forbidden_mask, everyone)
+        if clique.bit_count() > independence_number(self.room):
+            return self._covering_groups(clique)
+        if self.avoid_mixed_bank:
+            size, need, cliques = self.room.bank_size, 0, []
+            for g in range(self.n_genders):
+                members = sum(1 << i for i, x in enumerate(self.gender_id) if x == g)
+                clique = _max_clique(self.forbidden_mask, members)
+                if clique.bit_count() > -(-members.bit_count() // size):
+                    need += clique.bit_count()
+                    cliques.append(clique)
+                else:
+                    need += -(-members.bit_count() // size)
+            if need > len(self.bank_penalty):
+                rules: List[Rule] = [None]
+                for clique in cliques:
+                    rules += [g for g in self._covering_groups(clique) if g not in rules]
+                return rules
+        return None
+
+    def _covering_groups(self, students: int) -> List[Rule]:
+        """Verbodsgroepen en ``Apart``-regels die samen alle verboden paren
+        binnen *students* leveren."""
+        groups: List[Rule] = []
+
+        def covers(rule: Rule, pair: Set[str]) -> bool:
+            if isinstance(rule, Apart):
+                return rule.distance >= 2 and pair == {rule.a, rule.b}
+            return pair <= set(rule)
+
+        for a, b in itertools.combinations(iter_bits(students), 2):
+            pair = {self.names[a], self.names[b]}
+            if not any(covers(g, pair) for g in groups):
+                groups.append(next(g for g in [*self.forbidden_groups, *self.apart] if covers(g, pair)))
+        return groups
+
+    def _rule_label(self, rule: Rule) -> str:
+        if isinstance(rule, Apart):
+            return f"{rule.a} en {rule.b} minstens {rule.distance} bank{'en' * (rule.distance != 1)} uit elkaar"
+        if isinstance(rule, Together):
+            return "samen aan één bank: " + ", ".join(rule.names)
+        if isinstance(rule, Pin):
+            return f"{rule.name} vast op {rule.seat}"
+        if rule is not None:
+            return "verboden: " + ", ".join(rule)
+        counts = Counter(self.genders.get(n, "?") for n in self.names)
+        return "geen gemengde banken (" + ", ".join(f"{c} {g}" for g, c in sorted(counts.items())) + ")"
+
+    def _search_feasible(self, node_limit: int) -> Optional[bool]:
+        """Volledige zoektocht naar één geldige opstelling: ``True`` gevonden,
+        ``False`` bewezen onmogelijk, ``None`` budget op."""
+        nodes = 0
+        aborted = False
+
+        def prune(unplaced: int, domains: List[int]) -> bool:
+            nonlocal nodes, aborted
+            nodes += 1
+            aborted = aborted or nodes > node_limit
+            return aborted
+
+        order = list(range(len(self.seats1)))
+        owner = [-1] * len(self.seats1)
+        if self._solve([order] * len(self.names), owner, ScoreTracker(self), prune=prune):
             return True
-        name = self.names[idx]
-        for seat in seats:
-            if seat in assign:
+        return None if aborted else False
+
+    def _restricted(self, rules: List[Rule]) -> SeatingGenerator:
+        """Dezelfde klas met enkel de harde regels uit *rules*."""
+        return SeatingGenerator(self.names, [r for r in rules if isinstance(r, list)], genders=self.genders,
+                                avoid_mixed_bank=None in rules, room=self.room,
+                                apart=[r for r in rules if isinstance(r, Apart)],
+                                together=[r.names for r in rules if isinstance(r, Together)],
+                                pinned={r.name: r.seat for r in rules if isinstance(r, Pin)})
+
+    def precheck(self, *, node_limit: int = 2_000) -> List[str]:
+        """Haalbaarheidstoets vóór het zoeken (enkele milliseconden).
+
+        Werpt ``InfeasibleError`` als de harde regels bewezen niet samen kunnen:
+        eerst goedkope tellingen (zie ``_hard_conflict``), dan een volledige
+        zoektocht van hoogstens *node_limit* knopen.  Bij een bewijs worden
+        regels één voor één weggelaten zolang het bewijs overeind blijft, zodat
+        ``conflicts`` een kleine set is die samen de schuld draagt.  Zonder
+        bewijs (budget op) gaat het zoeken gewoon door.
+
+        Geeft waarschuwingen terug voor voorkeuren die nooit allemaal vervuld
+        kunnen worden (bv. meer solo's dan er banken vrij te maken zijn)."""
+        if self._precheck_warnings is not None:
+            return self._precheck_warnings
+
+        core = self._hard_conflict()
+        if core is not None:
+            def proves(rules):
+                return self._restricted(rules)._hard_conflict() is not None
+        elif self._search_feasible(node_limit) is False:
+            core = [*self.forbidden_groups, *self.apart, *self.together, *self.pins] + \
+                ([None] if self.avoid_mixed_bank else [])
+
+            def proves(rules):
+                sub = self._restricted(rules)
+                return sub._hard_conflict() is not None or sub._search_feasible(node_limit) is False
+        if core is not None:
+            # deletion filter: laat elke regel vallen die niet nodig is voor het bewijs
+            for rule in list(core):
+                trial = [r for r in core if r is not rule]
+                if proves(trial):
+                    core = trial
+            conflicts = [self._rule_label(r) for r in core]
+            raise InfeasibleError("Geen geldige opstelling mogelijk; deze regels kunnen niet samen: "
+                                  + "; ".join(conflicts), conflicts)
+
+        warnings = []
+        n, n_banks, size = len(self.names), len(self.bank_penalty), self.room.bank_size
+        solo = len(self.solo_pref & set(self.names))
+        fit = max((k for k in range(solo + 1) if k + -(-(n - k) // size) <= n_banks), default=0)
+        if fit < solo:
+            warnings.append(f"Hoogstens {fit} van de {solo} solo-voorkeuren kunnen vervuld worden.")
+        for prefs, seats, label in ((self.front_pref, self.front_seat, "vooraan"),
+                                    (self.back_pref, self.back_seat, "achteraan")):
+            wanted, room = len(prefs & set(self.names)), sum(seats)
+            if wanted > room:
+                warnings.append(f"{wanted} leerlingen willen {label} zitten, er zijn maar {room} plaatsen.")
+        self._precheck_warnings = warnings
+        return warnings
+
+    # ---------- zoekbudget ----------
+    def _dive(self, rng: random.Random) -> Tuple[float, float, Optional[int]]:
+        """Eén Knuth-duik: ``_solve`` zoals bij een herstart, maar met één
+        willekeurige stoel per knoop (bij ``guided`` onder de stoelen met de
+        grootste winst) en zonder terug te stappen.  Geeft (geschatte knopen,
+        gewicht, score): het gewicht is 1 / kans op dit pad (0 als de duik
+        doodloopt), de score ``None`` als hij doodloopt."""
+        tracker = ScoreTracker(self)
+        weight = nodes = 1.0
+
+        def choose(i: int, dom: int) -> int:
+            nonlocal weight, nodes
+            if self.guided:
+                gains = {s: tracker.gain(i, s) for s in iter_bits(dom)}
+                top = max(gains.values())
+                dom = sum(1 << s for s, g in gains.items() if g == top)
+            seats = list(iter_bits(dom))
+            s = rng.choice(seats)
+            # tweelingen zijn één kind in de boom: kans = hun aandeel in de keuze
+            weight *= len(seats) / (self.twin_mask[s] & dom).bit_count()
+            nodes += weight
+            return s
+
+        n_seats = len(self.seats1)
+        order = list(range(n_seats))
+        if not self._solve([order] * len(self.names), [-1] * n_seats, tracker, choose=choose,
+                           **self._guidance()):
+            return nodes, 0.0, None
+        return nodes, weight, tracker.score
+
+    def estimate_budget(self, n: int = 10, *, confidence: float = 0.95, probes: int = 200,
+                        min_attempts: int = 100, max_attempts: int = 1_000_000) -> BudgetEstimate:
+        """Kies het aantal herstarts voor ``generate_candidates(n)`` i.p.v. te gokken.
+
+        *probes* duiken (zie ``_dive``) schatten à la Knuth de grootte van de
+        zoekboom en het aantal geldige plannen (gemiddelde van 1 / padkans),
+        en per scoreniveau hoeveel plannen er minstens zo goed zijn.  Het
+        top-N-niveau is het hoogste niveau met zo minstens *n* plannen; een
+        herstart haalt het met kans ``top_rate``.  Nodig: genoeg treffers om
+        *n* verschillende plannen te trekken, met kans *confidence*
+        (normale benadering).  Haalde geen duik ``upper_bound()``, dan kunnen
+        betere plannen zeldzamer zijn dan één per *probes*: er wordt dan
+        gerekend met hoogstens die kans (``hit_rate``).  Kost ongeveer één milliseconde
+        per duik; de rng schuift mee (vaste seed ⇒ vaste schatting)."""
+        dives = [self._dive(self.rng) for _ in range(probes)]
+        tree_size = sum(d[0] for d in dives) / probes
+        valid = [(score, weight) for _, weight, score in dives if score is not None]
+        plans = sum(w for _, w in valid) / probes
+        if not valid:
+            return BudgetEstimate(max_attempts, probes, tree_size, plans, 0.0, None, 0.0, 0.0, confidence)
+        levels = sorted({score for score, _ in valid}, reverse=True)
+        level = levels[-1]
+        for score in levels:
+            if sum(w for sc, w in valid if sc >= score) / probes >= n:
+                level = score
+                break
+        hits = sum(sc >= level for sc, _ in valid)
+        rate = hits / probes
+        if levels[0] < self.upper_bound():
+            rate = min(rate, 1 / probes)
+        # verwacht aantal treffers om n verschillende uit m gelijkwaardige plannen te trekken
+        m = max(1.0, sum(w for sc, w in valid if sc >= level) / probes)
+        need = -m * math.log1p(-n / m) if m > n else m * (math.log(m) + 0.5772) + 1
+        z = NormalDist().inv_cdf(confidence)
+        hits_needed = (z / 2 + math.sqrt(z * z / 4 + need)) ** 2
+        attempts = min(max_attempts, max(min_attempts, math.ceil(hits_needed / rate)))
+        return BudgetEstimate(attempts, probes, tree_size, plans, len(valid) / probes,
+                              levels[0], hits / probes, rate, confidence)
+
+    # ---------- public API ----------
+    def anneal_candidates(self, n: int = 10, *, steps: int = 200_000,
+                          t_start: float = 200.0, t_end: float = 1.0) -> List[Candidate]:
+        """Lokaal zoeken i.p.v. telkens van nul herbeginnen.
+
+        Start van één geldige opstelling en probeert *steps* zetten: twee
+        leerlingen wisselen, of een leerling naar een lege stoel.  Zetten die
+        een harde regel breken worden nooit gedaan; de andere worden aanvaard
+        volgens simulated annealing op de score van ``_evaluate`` (temperatuur
+        zakt geometrisch van *t_start* naar *t_end*).  Stopt vroeger als
+        ``time_limit`` verstreken is."""
+        stats = self._start_run()
+        owner, tracker = self._first_plan()
+        n_seats = len(owner)
+        seat_of = [-1] * len(self.names)
+        occupied = 0
+        for s, i in enumerate(owner):
+            if i >= 0:
+                seat_of[i] = s
+                occupied |= 1 << s
+
+        pool = CandidatePool(n)
+
+        def offer() -> None:
+            self._offer(pool, owner, tracker)
+
+        offer()
+        rng = self.rng
+        cooling = (t_end / t_start) ** (1 / max(1, steps - 1))
+        temp = t_start
+        deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+        moves = accepted = 0
+        for step in range(steps):
+            if deadline is not None and not step % 1024 and time.monotonic() >= deadline:
+                break
+            moves += 1
+            temp *= cooling
+            i = rng.randrange(len(self.names))
+            s, t = seat_of[i], rng.randrange(n_seats)
+            j = owner[t]
+            if self.twin_mask[s] >> t & 1:
+                continue                  # zelfde plaats op een symmetrie na
+            # harde regels na de zet (bij een wissel komt j op s)
+            if not self._fits(i, t, seat_of, owner, occupied, ignore=j):
                 continue
-            # harde paren
-            if any(tuple(sorted((name, other))) in self.forbidden_pairs and self._are_adjacent(seat, s)
-                   for s, other in assign.items()):
+            if j >= 0 and not self._fits(j, s, seat_of, owner, occupied, ignore=i):
                 continue
-            # mixed bank
-            if self.avoid_mixed_bank:
-                mates = [assign[s] for s in assign if s[:2] == seat[:2]]
-                if mates and any(self.genders.get(m) != self.genders.get(name) for m in mates):
-                    continue
-            assign[seat] = name
-            if self._place_recursive(idx + 1, seats, assign):
+            before = tracker.score
+            tracker.remove(i, s)
+            if j >= 0:
+                tracker.remove(j, t)
+                tracker.add(j, s)
+            tracker.add(i, t)
+            delta = tracker.score - before
+            if delta < 0 and rng.random() >= math.exp(delta / temp):
+                # terugdraaien
+                tracker.remove(i, t)
+                if j >= 0:
+                    tracker.remove(j, s)
+                    tracker.add(j, t)
+                tracker.add(i, s)
+                continue
+            accepted += 1
+            owner[s], owner[t] = j, i
+            seat_of[i] = t
+            if j >= 0:
+                seat_of[j] = s
+            else:
+                occupied ^= (1 << s) | (1 << t)
+            if delta > 0 or pool.worst() is None or tracker.score > pool.worst():
+                offer()
+        stats.moves, stats.accepted = moves, accepted
+        stats.finish()
+        return self._candidates(pool)
+
+    def exact_candidates(self, n: int = 10, *, node_limit: Optional[int] = None) -> ExactResult:
+        """Branch-and-bound: de echte top-*n*, met bewijs van optimaliteit.
+
+        De zoekboom wordt volledig (diepte-eerst) afgelopen, maar een deelboom
+        wordt afgesneden zodra zelfs de meest optimistische afwerking de
+        huidige *n*-de beste niet kan verslaan.  Die optimistische grens telt
+        bij de huidige score: per ongeplaatste leerling de beste front/back-
+        bonus binnen zijn domein, een solobonus als er een lege bank in zijn
+        domein ligt, en de k beste bankwinsten (k = aantal ongeplaatsten).
+        Leerlingen met voorkeuren worden eerst geplaatst, zodat die grens al
+        hoog in de boom scherp wordt.  Wordt *node_limit* of ``time_limit``
+        bereikt, dan is ``optimal`` ``False`` en krijg je de beste plannen tot
+        dan."""
+        stats = self._start_run(check=False)
+        pool = CandidatePool(n)
+        owner = [-1] * len(self.seats1)
+        tracker = ScoreTracker(self)
+        # veelbelovende stoelen eerst: zo vullen we de pool snel met goede plannen
+        orders = [sorted(range(len(self.seats1)), key=lambda s: -bonus[s])
+                  for bonus in self.seat_bonus]
+        bonus_levels = self._bonus_levels()
+        bound = stats.bound = self.upper_bound()
+        nodes = 0
+        aborted = False
+        deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+
+        def on_leaf() -> bool:
+            self._offer(pool, owner, tracker)
+            return False
+
+        def prune(unplaced: int, domains: List[int]) -> bool:
+            nonlocal nodes, aborted
+            if aborted:
+                return True
+            nodes += 1
+            if (node_limit is not None and nodes > node_limit) or \
+                    (deadline is not None and not nodes % 256 and time.monotonic() >= deadline):
+                aborted = True
                 return True
-            del assign[seat]
-        return False
+            worst = pool.worst()
+            if worst is None:
+                return False
+            return worst >= bound or self._score_bound(tracker, unplaced, domains, bonus_levels) <= worst
 
-    # ---------- public API ----------
-    def generate_candidates(self, n: int = 10) -> List[Candidate]:
-        best: List[Candidate] = []
-        seats = self.seats1.copy()
-        for _ in range(self.max_attempts):
-            self.rng.shuffle(seats)
-            assign: Assignment = {}
-            if self._place_recursive(0, seats, assign):
-                score, missing = self._evaluate(assign)
-                best.append((assign.copy(), score, missing))
-                best.sort(key=lambda x: x[1], reverse=True)
-                best = best[:n]  # houd top-n
-                max_possible = 3 * len(self.front_pref | self.back_pref) + 2 * len(self.solo_pref)
-                if len(best) >= n and best[-1][1] == max_possible:
-                    break
+        # leerlingen met voorkeuren eerst: dan wordt de grens snel scherp
+        self._solve(orders, owner, tracker, on_leaf=on_leaf, prune=prune, rank=self.pref_rank,
+                    guided=self.guided, stats=stats)
+        stats.finish()
+        return ExactResult(self._candidates(pool), not aborted, nodes)
+
+    def iter_candidates(self, n: int = 10, *,
+                        progress: Optional[ProgressCallback] = None,
+                        cancel: Optional[CancelToken] = None,
+                        interval: float = 0.2,
+                        start: Sequence[Candidate] = ()) -> Iterator[List[Candidate]]:
+        """Herstartlus als generator: geeft de top-*n* (beste eerst) telkens
+        die verbetert, zodat een UI de beste plannen al kan tonen.
+
+        *progress(attempts, valid, elapsed)* wordt hoogstens om de *interval*
+        seconden opgeroepen, en één keer op het einde.  De lus stopt netjes
+        zodra ``cancel.is_set()`` waar is (bv. een ``threading.Event``) of
+        ``time_limit`` verstreken is.  Met ``node_budget`` geeft een herstart
+        op na ``node_budget * luby(k)`` knopen: een ongelukkige schudbeurt kan
+        zo nooit de hele tijd opslorpen, en het budget groeit toch mee voor
+        lastige klassen.  De lus stopt ook zodra alle *n* plannen
+        ``upper_bound()`` halen: beter kan niet meer.  Vooraf loopt
+        ``precheck()``: onmogelijke regels geven meteen een
+        ``InfeasibleError`` i.p.v. alle pogingen te verbruiken.
+        Met *start* (bv. uit ``klasplaatsen_cache``) begint de top-*n* niet leeg
+        maar met die opstellingen; die worden meteen een eerste keer gegeven."""
+        for pool in self._restarts(n, progress, cancel, interval, start):
+            yield self._candidates(pool)
+
+    def _restarts(self, n: int, progress: Optional[ProgressCallback], cancel: Optional[CancelToken],
+                  interval: float, start: Sequence[Candidate] = ()) -> Iterator[CandidatePool]:
+        """De herstartlus van ``iter_candidates``; geeft de pool (met ``Plan``-bytes)
+        telkens die verbetert.  Tellers lopen mee in ``self.stats``."""
+        stats = self._start_run()
+        pool = CandidatePool(n)
+        self._seed_pool(pool, start)
+        if len(pool):
+            yield pool
+        # zodra de hele top-n de bovengrens haalt, kan geen herstart nog iets verbeteren;
+        # vóór de klok start, zodat de grens nooit rekentijd van de herstarts afneemt
+        bound = stats.bound = self.upper_bound()
+        n_seats = len(self.seats1)
+        order = list(range(n_seats))
+        orders = [order] * len(self.names)
+        started = last_report = time.monotonic()
+        deadline = started + self.time_limit if self.time_limit is not None else None
+        attempts = valid = 0
+        while attempts < self.max_attempts and pool.worst() != bound:
+            if cancel is not None and cancel.is_set():
+                break
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            attempts += 1
+            stats.restarts = attempts
+            if progress is not None and now - last_report >= interval:
+                progress(attempts, valid, now - started)
+                last_report = now
+            self.rng.shuffle(order)
+            owner = [-1] * n_seats
+            tracker = ScoreTracker(self)
+            budget = self.node_budget * luby(attempts) if self.node_budget else None
+            if not self._solve(orders, owner, tracker, node_limit=budget, deadline=deadline, stats=stats,
+                               **self._guidance()):
+                continue
+            valid += 1
+            stats.valid = valid
+            if self._offer(pool, owner, tracker):
+                stats.finish()
+                yield pool
+        stats.finish()
+        if progress is not None:
+            progress(attempts, valid, time.monotonic() - started)
+
+    def generate_candidates(self, n: int = 10, *, workers: int = 1,
+                            start: Sequence[Candidate] = ()) -> List[Candidate]:
+        """Top-*n* via ``max_attempts`` willekeurige herstarts.
+
+        Met *workers* > 1 worden de pogingen verdeeld over evenveel processen.
+        Elk proces krijgt een eigen ``random.Random`` met een seed afgeleid van
+        ``self.rng``; de top-*n* van alle processen wordt in vaste volgorde
+        samengevoegd, zodat een vaste seed ook parallel hetzelfde resultaat geeft.
+        De tellers van de processen worden opgeteld in ``self.stats``.
+        *start*: zie ``iter_candidates``."""
+        if workers <= 1:
+            best: List[Candidate] = []
+            for best in self.iter_candidates(n, start=start):
+                pass
+        else:
+            stats = self._start_run()  # precheck één keer hier; de werkprocessen erven het resultaat
+            stats.bound = self.upper_bound()   # idem voor de bovengrens
+            pool = CandidatePool(n)
+            self._seed_pool(pool, start)
+            master = self.rng.getrandbits(64)
+            shares = [self.max_attempts // workers + (k < self.max_attempts % workers)
+                      for k in range(workers)]
+            if pool.worst() == stats.bound:
+                shares = []    # de bewaarde top-n is al optimaal
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                shards = executor.map(_restart_shard, itertools.repeat(self), itertools.repeat(n),
+                                      shares, [master + k for k in range(workers)])
+                for items, shard_stats in shards:
+                    for score, plan in items:
+                        pool.add(score, plan, plan)
+                    stats.merge(shard_stats)
+            stats.finish()
+            best = self._candidates(pool)
 
         if not best:
             raise RuntimeError("Geen enkele geldige opstelling gevonden.")
         return best
 
+    def rotation(self, periods: int, *, history: Optional[Sequence[Sequence[int]]] = None,
+                 workers: int = 1) -> Rotation:
+        """Opstellingen voor *periods* opeenvolgende periodes (bv. een trimester).
+
+        Per periode de beste opstelling van ``generate_candidates``, met de
+        burentelling van alle vorige periodes als strafterm in de score
+        (``REPEAT_PENALTY`` per keer dat een buurpaar terugkomt; buren in
+        eender welke opstelling tellen).  Vertrekt van *history* (bv. de
+        ``history`` van een vorige reeks) of van niets.  ``time_limit`` en
+        ``max_attempts`` gelden per periode."""
+        n = len(self.names)
+        counts: PairHistory = [list(row) for row in history] if history is not None \
+            else [[0] * n for _ in range(n)]
+        plans: List[Candidate] = []
+        try:
+            for _ in range(periods):
+                self.set_history(counts)
+                assign, score, missing = self.generate_candidates(1, workers=workers)[0]
+                plans.append((assign, score, missing))
+                for i, j in self.neighbour_pairs(self._owner(assign)):
+                    counts[i][j] += 1
+                    counts[j][i] += 1
+        finally:
+            self.set_history(history)
+        return Rotation(plans, counts)
+
+    def repair(self, current: Assignment, *, node_limit: Optional[int] = 50_000,
+               polish_nodes: int = 2_000) -> RepairResult:
+        """Herstel een bestaande opstelling na een wijziging in de klas (leerling
+        erbij of weg, nieuwe verboden groep, ...) met zo weinig mogelijk
+        verplaatsingen.
+
+        Maak de generator met de nieuwe klas en geef de oude indeling mee;
+        namen die niet meer in de klas zitten en onbekende stoelen vallen weg.
+        Branch-and-bound op eerst het aantal leerlingen dat van stoel wisselt
+        (nieuwe leerlingen tellen niet), dan de score.  Elke leerling probeert
+        eerst zijn oude stoel; nieuwe leerlingen en wie nu een harde regel
+        breekt worden eerst geplaatst; wie toch moet verhuizen probeert eerst
+        stoelen die van niemand zijn.  Ondergrens op het aantal verplaatsingen:
+        wie al elders zit, wiens oude stoel niet meer kan, en per gebroken paar
+        (disjunct) minstens één van beide.  Een eerste ronde bewijst zo het
+        minimum; een tweede van hoogstens *polish_nodes* knopen zoekt bij dat
+        aantal de beste score (wie dan niet meer mag verhuizen, telt vast mee
+        in de scoregrens).  Wordt *node_limit* of ``time_limit`` bereikt in de
+        eerste ronde, dan is ``optimal`` ``False`` en krijg je het beste plan tot dan."""
+        stats = self._start_run()
+        n, n_seats = len(self.names), len(self.seats1)
+        home = [-1] * n
+        for seat, name in current.items():
+            s, i = self.seat_index.get(seat), self.student_index.get(name)
+            if s is not None and i is not None:
+                home[i] = s
+        owner = [-1] * n_seats
+        occupied = 0
+        for i, s in enumerate(home):
+            if s >= 0:
+                owner[s] = i
+                occupied |= 1 << s
+        kept = 0
+        rank = [0] * n
+        broken: List[Tuple[int, int]] = []     # paren die nu een harde regel breken
+        for i, s in enumerate(home):
+            if s < 0:
+                continue
+            kept |= 1 << i
+            if self._fits(i, s, home, owner, occupied):
+                rank[i] = 1                    # gebroken regel: eerst plaatsen
+                continue
+            for k, table in self.links[i]:
+                if home[k] > s and table[s] >> home[k] & 1:
+                    broken.append((i, k))
+            if self.avoid_mixed_bank:
+                for t in iter_bits(self.bank_mask[s] & occupied):
+                    if t > s and self.gender_id[owner[t]] != self.gender_id[i]:
+                        broken.append((i, owner[t]))
+        # verhuizen: eerst naar stoelen van niemand (die zijn onderling wel inwisselbaar)
+        vacant = ((1 << n_seats) - 1) & ~occupied
+        twins = [self.twin_mask[s] & vacant if vacant >> s & 1 else 1 << s for s in range(n_seats)]
+        orders = []
+        for i, bonus in enumerate(self.seat_bonus):
+            rest = sorted((s for s in range(n_seats) if s != home[i]),
+                          key=lambda s: (not vacant >> s & 1, -bonus[s]))
+            orders.append([home[i], *rest] if home[i] >= 0 else rest)
+
+        bonus_levels = self._bonus_levels()
+        best_moves, best_score, best_owner = n + 1, 0, None
+        deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+
+        def search(limit: Optional[int], polish: bool) -> bool:
+            """Eén branch-and-bound; ``False`` als *limit* of de tijd op raakte.
+            Zonder *polish* volstaat het eerste plan per aantal verplaatsingen;
+            met *polish* wordt bij evenveel verplaatsingen op score gezocht."""
+            owner = [-1] * n_seats
+            tracker = ScoreTracker(self)
+            nodes = 0
+            aborted = False
+
+            def on_leaf() -> bool:
+                nonlocal best_moves, best_score, best_owner
+                moved = sum(owner[home[i]] != i for i in iter_bits(kept))
+                if moved < best_moves or (moved == best_moves and tracker.score > best_score):
+                    best_moves, best_score, best_owner = moved, tracker.score, owner.copy()
+                    stats.improved(tracker.score)
+                return False
+
+            def prune(unplaced: int, domains: List[int]) -> bool:
+                nonlocal nodes, aborted
+                if aborted:
+                    return True
+                nodes += 1
+                if (limit is not None and nodes > limit) or \
+                        (deadline is not None and not nodes % 256 and time.monotonic() >= deadline):
+                    aborted = True
+                    return True
+                # wie al elders zit, of wiens oude stoel niet meer kan, is zeker verplaatst
+                bound = sum(owner[home[i]] != i for i in iter_bits(kept & ~unplaced))
+                open_home = 0
+                for i in iter_bits(kept & unplaced):
+                    if domains[i] >> home[i] & 1:
+                        open_home |= 1 << i
+                    else:
+                        bound += 1
+                for i, k in broken:            # van elk gebroken paar moet er één weg
+                    if open_home >> i & 1 and open_home >> k & 1:
+                        open_home &= ~(1 << i | 1 << k)
+                        bound += 1
+                if bound != best_moves or not polish:
+                    return bound >= best_moves if not polish else bound > best_moves
+                # nog één verplaatsing meer mag niet: wie overblijft in open_home blijft zitten
+                stay = list(iter_bits(open_home))
+                for i in stay:
+                    tracker.add(i, home[i])
+                try:
+                    return self._score_bound(tracker, unplaced & ~open_home, domains,
+                                             bonus_levels) <= best_score
+                finally:
+                    for i in reversed(stay):
+                        tracker.remove(i, home[i])
+
+            # tweelingstoelen zijn enkel inwisselbaar als ze van niemand zijn: de oude stoel telt
+            self._solve(orders, owner, tracker, on_leaf=on_leaf, prune=prune, rank=rank,
+                        stats=stats, twins=twins, guided=polish)
+            return not aborted
+
+        # eerst het minimum aan verplaatsingen bewijzen, dan met een klein budget de score opkrikken
+        optimal = search(node_limit, polish=False)
+        if best_owner is not None:
+            search(polish_nodes, polish=True)
+        stats.finish()
+        if best_owner is None:
+            raise RuntimeError("Geen enkele geldige opstelling gevonden.")
+        moved = [self.names[i] for i in iter_bits(kept) if best_owner[home[i]] != i]
+        return RepairResult(self._candidate(bytes(i + 1 for i in best_owner)), moved, optimal)
+
+
+def _restart_shard(gen: SeatingGenerator, n: int, attempts: int,
+                   seed: int) -> Tuple[List[Tuple[int, Plan]], SearchStats]:
+    """Werkproces voor ``generate_candidates(workers=...)``: eigen rng, eigen
+    top-*n*; stuurt enkel (score, ``Plan``) en de tellers terug, de rest maakt de ouder."""
+    gen.rng = random.Random(seed)
+    gen.max_attempts = attempts
+    pool = CandidatePool(n)
+    for pool in gen._restarts(n, None, None, 0.0):
+        pass
+    return pool.items(), gen.stats
+
 
 # ------------------------------------------------------------
-# 4. Visualisatie
+# 6. Klaslijsten (invoerbestand zoals tools.py het exporteert)
 # ------------------------------------------------------------
 
+ROSTER_KEYS = ("jongens", "meisjes", "verboden", "solo", "back", "front")
+
+
+class Roster(NamedTuple):
+    boys: List[str]
+    girls: List[str]
+    forbidden_groups: List[List[str]]
+    solo: List[str]
+    back: List[str]
+    front: List[str]
+
+    @property
+    def names(self) -> List[str]:
+        return self.boys + self.girls
+
+    @property
+    def genders(self) -> Dict[str, str]:
+        genders = {n: "M" for n in self.boys}
+        genders.update({n: "V" for n in self.girls})
+        return genders
+
+
+def split_csv(txt: str) -> List[str]:
+    return [x.strip() for x in txt.split(",") if x.strip()]
+
+
+def split_groups(txt: str) -> List[List[str]]:
+    return [split_csv(line) for line in txt.strip().splitlines() if line.strip()]
+
+
+def parse_roster_fields(content: str) -> Dict[str, str]:
+    """``sleutel:tekst``-blokken; lijnen zonder sleutel horen bij het vorige blok
+    (``verboden`` beslaat één lijn per groepje)."""
+    fields = {key: "" for key in ROSTER_KEYS}
+    current = None
+    for line in content.splitlines():
+        key, sep, rest = line.partition(":")
+        if sep and key.strip().lower() in fields:
+            current = key.strip().lower()
+            fields[current] = rest
+        elif current is not None and line.strip():
+            fields[current] += "\n" + line
+    return fields
+
+
+def build_roster(jongens: str, meisjes: str, verboden: str = "",
+                 solo: str = "", back: str = "", front: str = "") -> Roster:
+    """Controleer en splits de tekstvelden; ``ValueError`` bij dubbele of onbekende namen."""
+    roster = Roster(split_csv(jongens), split_csv(meisjes), split_groups(verboden),
+                    split_csv(solo), split_csv(back), split_csv(front))
+    names = roster.names
+    dupes = [n for n, cnt in Counter(names).items() if cnt > 1]
+    if dupes:
+        raise ValueError("Dubbele namen in leerlingenlijst. Zorg dat elke naam uniek is "
+                         f"(bv afkorting achternaam toevoegen): {', '.join(dupes)}")
+    known = set(names)
+    unknown = {n for lst in roster.forbidden_groups + [roster.solo, roster.back, roster.front]
+               for n in lst if n not in known}
+    if unknown:
+        raise ValueError(f"Onbekende namen: {', '.join(sorted(unknown))}")
+    return roster
+
+
+def parse_roster(content: str) -> Roster:
+    return build_roster(**parse_roster_fields(content))
+
+
+def roster_text(jongens: str, meisjes: str, verboden: str = "",
+                solo: str = "", back: str = "", front: str = "") -> str:
+    """Omgekeerde van ``parse_roster_fields`` (het downloadbare txt-bestand)."""
+    fields = dict(jongens=jongens, meisjes=meisjes, verboden=verboden, solo=solo, back=back, front=front)
+    return "\n".join(f"{key}:{fields[key]}\n" for key in ROSTER_KEYS)
+
+
+# ------------------------------------------------------------
+# 7. Visualisatie
+# ------------------------------------------------------------
+
+def layout_grid(assignment: Assignment, seats: Sequence[Seat]) -> List[List[List[Optional[str]]]]:
+    """Rij → bank → plaatsen (``None`` = leeg); rij 0 staat het verst van het bord."""
+    max_row = max(r for r, _, _ in seats)
+    max_col = max(c for _, c, _ in seats)
+    grid: List[List[List[Optional[str]]]] = [[[] for _ in range(max_col + 1)] for _ in range(max_row + 1)]
+    for seat in sorted(seats, key=lambda s: s[2]):
+        grid[seat[0]][seat[1]].append(assignment.get(seat))
+    return grid
+
 def print_layout(assignment: Assignment, seats: Sequence[Seat]) -> None:
     banks = defaultdict(list)
     for seat, name in assignment.items():
@@ -238,13 +1971,27 @@ def print_layout(assignment: Assignment, seats: Sequence[Seat]) -> None:
 
 
 # ------------------------------------------------------------
-# 5. CLI-demo
+# 8. CLI-demo
 # ------------------------------------------------------------
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--n", type=int, default=10, help="Aantal lay-outs om te tonen")
     parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--anneal", action="store_true",
+                        help="Lokaal zoeken (simulated annealing) i.p.v. herstarts")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="Maximale rekentijd in seconden")
+    parser.add_argument("--node-budget", type=int, default=None,
+                        help="Basisbudget aan knopen per herstart (groeit volgens Luby)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Aantal processen voor de herstarts")
+    parser.add_argument("--exact", action="store_true",
+                        help="Branch-and-bound: bewezen beste N opstellingen")
+    parser.add_argument("--periods", type=int, default=None,
+                        help="Rotatie: één opstelling per periode, telkens zoveel mogelijk nieuwe buren")
+    parser.add_argument("--stats", action="store_true",
+                        help="Toon zoekstatistieken (knopen, afgesneden takken, ...)")
     args = parser.parse_args()
 
     leerlingen = [
@@ -263,8 +2010,17 @@ def main():
     gen = SeatingGenerator(leerlingen, verboden,
                            front_pref=front, back_pref=back, solo_pref=solo,
                            genders=genders, avoid_mixed_bank=True,
-                           rng=rng)
-    cands = gen.generate_candidates(args.n)
+                           rng=rng, time_limit=args.time_limit, node_budget=args.node_budget)
+    if args.periods:
+        cands = gen.rotation(args.periods, workers=args.workers).plans
+    elif args.exact:
+        result = gen.exact_candidates(args.n)
+        cands = result.candidates
+        print(f"{'Bewezen optimaal' if result.optimal else 'Niet bewezen'} na {result.nodes} knopen")
+    elif args.anneal:
+        cands = gen.anneal_candidates(args.n)
+    else:
+        cands = gen.generate_candidates(args.n, workers=args.workers)
 
     for i, (assign, sc, miss) in enumerate(cands, 1):
         print(f"\n### Kandidaat {i} — score {sc}")
@@ -275,10 +2031,12 @@ def main():
         print("\nOpstelling 1 (4×3, front onder)")
         print_layout(assign, gen.seats1)
         print("\nOpstelling 2 (3×4, front onder)")
-        assign2 = {map_to_layout2(s): n for s, n in assign.items()}
-        print_layout(assign2, gen.seats2)
+        print_layout(gen.variant_assignment(assign, 1), gen.variant_seats[1])
         print("#" * 80)
 
+    if args.stats:
+        print("\nZoekstatistieken: " + gen.stats.summary())
+
 
 if __name__ == "__main__":
     main()
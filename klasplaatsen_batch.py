@@ -0,0 +1,198 @@
+# klasplaatsen_batch.py
+"""Zitplannen voor een hele school in één keer
+---------------------------------------------
+*   Leest klaslijsten in het formaat van het downloadbare txt-bestand uit
+    tools.py (``jongens:`` / ``meisjes:`` / ``verboden:`` / ``solo:`` /
+    ``back:`` / ``front:``), één bestand per klas.
+*   Elke klas wordt in een eigen proces opgelost; de bestandsnaam is de klasnaam.
+*   Per klas een JSON-bestand met de beste N opstellingen, plus één CSV
+    (één lijn per leerling per opstelling) voor de hele school.
+*   ``--attempts auto`` kiest het aantal herstarts per klas zelf (zie
+    ``SeatingGenerator.estimate_budget``); de schatting staat mee in de JSON.
+
+Gebruik
+~~~~bash
+python klasplaatsen_batch.py klaslijsten/ --out zitplannen --n 5 --time-limit 20
+~~~~
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from klasplaatsen2 import SeatingGenerator, layout_grid, parse_roster
+from klasplaatsen_cache import DEFAULT_DIR, SeatingCache, roster_key
+
+ClassResult = Dict[str, object]  # klas, leerlingen, seconden, opstellingen | fout
+
+CSV_FIELDS = ("klas", "optie", "score", "opstelling", "leerling", "rij", "kolom", "kant")
+
+
+class BatchSettings(NamedTuple):
+    n: int = 5
+    attempts: Optional[int] = 100000    # None = automatisch (SeatingGenerator.estimate_budget)
+    time_limit: Optional[float] = None
+    node_budget: Optional[int] = 200
+    avoid_mixed: bool = False
+    seed: Optional[int] = None
+    cache: Optional[str] = None     # map van klasplaatsen_cache; None = geen cache
+
+
+# ------------------------------------------------------------
+# 1. Invoer
+# ------------------------------------------------------------
+
+def collect_rosters(paths: Iterable[str]) -> List[Path]:
+    """Bestanden zoals opgegeven; van mappen alle ``*.txt`` (gesorteerd)."""
+    found: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            found.extend(sorted(p.glob("*.txt")))
+        else:
+            found.append(p)
+    return found
+
+
+# ------------------------------------------------------------
+# 2. Eén klas oplossen (werkproces)
+# ------------------------------------------------------------
+
+def solve_roster(path: Path, settings: BatchSettings) -> ClassResult:
+    klas = path.stem
+    start = time.perf_counter()
+    try:
+        roster = parse_roster(path.read_text(encoding="utf-8"))
+        # Zaadje per klas: reproduceerbaar, onafhankelijk van volgorde en aantal processen.
+        rng = random.Random(f"{settings.seed}:{klas}" if settings.seed is not None else None)
+        gen = SeatingGenerator(roster.names, roster.forbidden_groups,
+                               front_pref=roster.front, back_pref=roster.back, solo_pref=roster.solo,
+                               genders=roster.genders, avoid_mixed_bank=settings.avoid_mixed,
+                               max_attempts=settings.attempts or 0, rng=rng,
+                               time_limit=settings.time_limit, node_budget=settings.node_budget)
+        budget = None
+        if settings.attempts is None:
+            budget = gen.estimate_budget(settings.n)
+            gen.max_attempts = budget.attempts
+        if settings.cache is not None:
+            key = roster_key(roster, avoid_mixed=settings.avoid_mixed, seed=settings.seed)
+            cands = SeatingCache(settings.cache).generate(gen, key, settings.n)
+        else:
+            cands = gen.generate_candidates(settings.n)
+    except (OSError, ValueError, RuntimeError) as e:
+        return {"klas": klas, "fout": str(e)}
+
+    opties = []
+    for assign, sc, miss in cands:
+        layouts = [gen.variant_assignment(assign, v) for v in range(len(gen.variant_seats))]
+        opties.append({
+            "score": sc,
+            "niet_voldaan": miss,
+            "opstellingen": [layout_grid(a, seats) for a, seats in zip(layouts, gen.variant_seats)],
+            "plaatsen": [[{"leerling": name, "rij": r, "kolom": c, "kant": side}
+                          for (r, c, side), name in sorted(a.items())] for a in layouts],
+        })
+    result = {"klas": klas, "leerlingen": len(roster.names),
+              "seconden": round(time.perf_counter() - start, 3), "opstellingen": opties,
+              "statistieken": gen.stats.as_dict()}
+    if budget is not None:
+        result["budget"] = budget._asdict()
+    return result
+
+
+def solve_all(paths: List[Path], settings: BatchSettings, *, workers: int = 1) -> List[ClassResult]:
+    """Alle klassen, ``workers`` tegelijk; resultaat in de volgorde van ``paths``."""
+    if workers <= 1 or len(paths) <= 1:
+        return [solve_roster(p, settings) for p in paths]
+    results: Dict[Path, ClassResult] = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = {pool.submit(solve_roster, p, settings): p for p in paths}
+        for fut in as_completed(futures):
+            results[futures[fut]] = fut.result()
+    return [results[p] for p in paths]
+
+
+# ------------------------------------------------------------
+# 3. Uitvoer
+# ------------------------------------------------------------
+
+def write_json(results: List[ClassResult], out: Path) -> None:
+    for res in results:
+        with open(out / f"{res['klas']}.json", "w", encoding="utf-8") as fh:
+            json.dump(res, fh, ensure_ascii=False, indent=2)
+
+
+def write_csv(results: List[ClassResult], out: Path) -> None:
+    with open(out / "zitplannen.csv", "w", encoding="utf-8", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for res in results:
+            for optie, plan in enumerate(res.get("opstellingen", []), 1):
+                for opstelling, plaatsen in enumerate(plan["plaatsen"], 1):
+                    for p in plaatsen:
+                        writer.writerow({"klas": res["klas"], "optie": optie, "score": plan["score"],
+                                         "opstelling": opstelling, **p})
+
+
+# ------------------------------------------------------------
+# 4. CLI
+# ------------------------------------------------------------
+
+def _attempts(text: str) -> Optional[int]:
+    return None if text == "auto" else int(text)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = BatchSettings()
+    parser = argparse.ArgumentParser(description="Zitplannen voor meerdere klassen tegelijk")
+    parser.add_argument("paths", nargs="+", help="Klaslijsten (.txt) of mappen met klaslijsten")
+    parser.add_argument("--out", default="zitplannen", help="Uitvoermap")
+    parser.add_argument("--format", choices=("json", "csv", "beide"), default="beide")
+    parser.add_argument("--n", type=int, default=defaults.n, help="Aantal opstellingen per klas")
+    parser.add_argument("--attempts", type=_attempts, default=defaults.attempts,
+                        help="Maximaal aantal herstarts per klas, of 'auto' (geschat per klas)")
+    parser.add_argument("--time-limit", type=float, default=None, help="Maximale rekentijd per klas (s)")
+    parser.add_argument("--node-budget", type=int, default=defaults.node_budget,
+                        help="Basisbudget aan knopen per herstart (groeit volgens Luby)")
+    parser.add_argument("--avoid-mixed", action="store_true", help="Vermijd duo's jongen + meisje")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--cache", nargs="?", const=str(DEFAULT_DIR), default=None,
+                        help="Hergebruik eerdere resultaten (optioneel: map van de cache)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Aantal klassen dat tegelijk berekend wordt")
+    args = parser.parse_args(argv)
+
+    paths = collect_rosters(args.paths)
+    if not paths:
+        parser.error("geen klaslijsten gevonden")
+    settings = BatchSettings(args.n, args.attempts, args.time_limit, args.node_budget,
+                             args.avoid_mixed, args.seed, args.cache)
+    results = solve_all(paths, settings, workers=args.workers)
+
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    if args.format in ("json", "beide"):
+        write_json(results, out)
+    if args.format in ("csv", "beide"):
+        write_csv(results, out)
+
+    failed = 0
+    for res in results:
+        if "fout" in res:
+            failed += 1
+            print(f"{res['klas']:<20} FOUT: {res['fout']}", file=sys.stderr)
+        else:
+            scores = ", ".join(str(o["score"]) for o in res["opstellingen"])
+            print(f"{res['klas']:<20} {res['leerlingen']:>3} lln  {res['seconden']:>7.2f}s  scores: {scores}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+# klasplaatsen_bench.py
+"""Benchmark voor de zitplan-solvers
+----------------------------------
+*   Synthetische klassen (met seed) over een rooster van klasgroottes,
+    dichtheid aan verbodsgroepen en aantal solo/front/back-voorkeuren.
+*   Per klas en per solver, binnen hetzelfde tijdsbudget:
+    –   pogingen per seconde (herstarts; bij ``Klasplaatsen`` = aanroepen),
+    –   tijd tot de eerste geldige opstelling,
+    –   tijd tot de doelscore: het optimum als ``exact_candidates`` het binnen
+        het budget bewijst, anders de beste score die eender welke run haalde,
+    –   de scores van de uiteindelijke top-N.
+*   Resultaat als JSON-baseline; ``--compare`` zet een nieuwe run naast een oude.
+
+``Klasplaatsen.generate_seating`` wordt gescoord met ``SeatingGenerator._evaluate``
+na de afbeelding rij r → 3 − r (daar is rij 0 vooraan, hier achteraan).  Dat is
+een benadering: opstelling B wordt er iets anders afgeleid, en solo is er een
+harde regel i.p.v. een voorkeur.
+
+Gebruik
+~~~~bash
+python klasplaatsen_bench.py --budget 1 --out baseline.json
+python klasplaatsen_bench.py --budget 1 --compare baseline.json
+~~~~
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import itertools
+import json
+import multiprocessing
+import platform
+import queue
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import Klasplaatsen
+from klasplaatsen2 import Assignment, CandidatePool, Roster, SeatingGenerator
+
+SIZES = (12, 16, 20, 24)
+DENSITIES = (0.0, 0.2, 0.4)   # aandeel leerlingen in een verbodsgroep
+PREF_COUNTS = (0, 2, 4)       # aantal solo- én front- én back-voorkeuren
+
+Metrics = Dict[str, object]
+
+
+class Scenario(NamedTuple):
+    size: int
+    density: float
+    prefs: int
+
+    @property
+    def id(self) -> str:
+        return f"n{self.size}-d{self.density:g}-p{self.prefs}"
+
+
+# ------------------------------------------------------------
+# 1. Synthetische klassen
+# ------------------------------------------------------------
+
+def synthetic_roster(sc: Scenario, seed: int) -> Roster:
+    rng = random.Random(f"{seed}:{sc.id}")
+    names = [f"L{i:02d}" for i in range(1, sc.size + 1)]
+    boys = sorted(rng.sample(names, sc.size // 2))
+    girls = [n for n in names if n not in boys]
+
+    pool = rng.sample(names, round(sc.density * sc.size))
+    groups: List[List[str]] = []
+    while len(pool) >= 2:
+        k = 3 if len(pool) == 3 or (len(pool) > 4 and rng.random() < 0.3) else 2
+        groups.append(pool[:k])
+        pool = pool[k:]
+    solo, front, back = (rng.sample(names, sc.prefs) for _ in range(3))
+    return Roster(boys, girls, groups, solo, back, front)
+
+
+# ------------------------------------------------------------
+# 2. Meten
+# ------------------------------------------------------------
+
+class _Trace:
+    """Verloop van één run: tijdstip van elke verbetering van de top-N."""
+
+    def __init__(self, n: int):
+        self.n = n
+        self.first_valid: Optional[float] = None
+        self.best: List[List[float]] = []   # [seconden, beste score] bij elke nieuwe beste
+        self.scores: List[int] = []
+
+    def improved(self, elapsed: float, scores: Sequence[int]) -> None:
+        if self.first_valid is None:
+            self.first_valid = elapsed
+        self.scores = sorted(scores, reverse=True)[:self.n]
+        if not self.best or self.scores[0] > self.best[-1][1]:
+            self.best.append([round(elapsed, 4), self.scores[0]])
+
+    def metrics(self, attempts: int, valid: int, seconds: float) -> Metrics:
+        r = lambda x: None if x is None else round(x, 4)
+        return {"attempts": attempts, "valid": valid, "seconds": r(seconds),
+                "attempts_per_sec": r(attempts / seconds if seconds else 0.0),
+                "first_valid_s": r(self.first_valid), "top_scores": self.scores,
+                "best_trace": self.best}
+
+
+def time_to_target(m: Metrics, target: Optional[int]) -> Optional[float]:
+    if target is None:
+        return None
+    return next((t for t, score in m["best_trace"] if score >= target), None)
+
+
+def make_generator(roster: Roster, seed: int, budget: float) -> SeatingGenerator:
+    return SeatingGenerator(roster.names, roster.forbidden_groups,
+                            front_pref=roster.front, back_pref=roster.back, solo_pref=roster.solo,
+                            genders=roster.genders, rng=random.Random(seed),
+                            max_attempts=10 ** 9, time_limit=budget, node_budget=200)
+
+
+def target_score(roster: Roster, seed: int, budget: float) -> tuple:
+    """(beste score van branch-and-bound, bewezen optimaal?)"""
+    result = make_generator(roster, seed, budget).exact_candidates(1)
+    return (result.candidates[0][1] if result.candidates else None), result.optimal
+
+
+def bench_generator(roster: Roster, seed: int, budget: float, n: int) -> Metrics:
+    gen = make_generator(roster, seed, budget)
+    trace = _Trace(n)
+    counts = [0, 0, 0.0]
+
+    def progress(attempts, valid, seconds):
+        counts[:] = attempts, valid, seconds
+
+    start = time.monotonic()
+    for best in gen.iter_candidates(n, progress=progress, interval=budget):
+        trace.improved(time.monotonic() - start, [sc for _, sc, _ in best])
+    return trace.metrics(*counts)
+
+
+def legacy_assignment(grid_a: List[List[List[Optional[str]]]]) -> Assignment:
+    """Layout A van ``Klasplaatsen`` → stoelen van ``klasplaatsen2`` (rij r → 3 − r)."""
+    rows = len(grid_a)
+    return {(rows - 1 - r, c, "LR"[side]): pupil
+            for r, row in enumerate(grid_a) for c, bank in enumerate(row)
+            for side, pupil in enumerate(bank) if pupil not in (None, "—")}
+
+
+def _legacy_worker(roster: Roster, seed: int, budget: float, out: multiprocessing.Queue) -> None:
+    random.seed(seed)   # generate_seating gebruikt de globale rng
+    start = time.monotonic()
+    while time.monotonic() - start < budget:
+        try:
+            grid_a, _ = Klasplaatsen.generate_seating(roster.names, roster.forbidden_groups,
+                                                      roster.front, roster.back, roster.solo,
+                                                      max_attempts=1)
+        except ValueError:
+            out.put((time.monotonic() - start, None))
+        else:
+            out.put((time.monotonic() - start, legacy_assignment(grid_a)))
+    out.put(None)
+
+
+def bench_legacy(roster: Roster, seed: int, budget: float, n: int) -> Metrics:
+    """``generate_seating`` heeft geen knopenbudget: één aanroep kan blijven
+    hangen, dus draait hij in een apart proces dat na het budget (plus wat
+    speling) wordt afgebroken.  Wat tot dan binnenkwam, telt."""
+    scorer = make_generator(roster, seed, budget)
+    trace = _Trace(n)
+    out: multiprocessing.Queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=_legacy_worker, args=(roster, seed, budget, out), daemon=True)
+    proc.start()
+    hard_stop = time.monotonic() + 2 * budget + 1.0
+    attempts = valid = 0
+    seconds = 0.0
+    pool = CandidatePool(n)
+    timed_out = True
+    while time.monotonic() < hard_stop:
+        try:
+            item = out.get(timeout=max(0.0, hard_stop - time.monotonic()))
+        except queue.Empty:
+            break
+        if item is None:
+            timed_out = False
+            break
+        seconds, assign = item
+        attempts += 1
+        if assign is None:
+            continue
+        valid += 1
+        score, missing = scorer._evaluate(assign)
+        key = scorer.plan_key(assign)
+        if pool.admits(score, key):
+            pool.add(score, key, (assign, score, missing))
+            trace.improved(seconds, [sc for _, sc, _ in pool.candidates()])
+    if proc.is_alive():
+        proc.terminate()
+    proc.join()
+    metrics = trace.metrics(attempts, valid, seconds)
+    metrics["timed_out"] = timed_out
+    return metrics
+
+
+# ------------------------------------------------------------
+# 3. Baseline
+# ------------------------------------------------------------
+
+def run(scenarios: Sequence[Scenario], *, seed: int, budget: float, n: int,
+        legacy: bool = True, verbose: bool = True) -> Dict[str, object]:
+    results = []
+    for sc in scenarios:
+        roster = synthetic_roster(sc, seed)
+        exact, proven = target_score(roster, seed, budget)
+        runs = {"generator": bench_generator(roster, seed, budget, n)}
+        if legacy:
+            runs["legacy"] = bench_legacy(roster, seed, budget, n)
+        # Doel: het bewezen optimum, anders de beste score die iemand haalde.
+        found = [m["top_scores"][0] for m in runs.values() if m["top_scores"]]
+        target = exact if proven else max(found + ([exact] if exact is not None else []), default=None)
+        for m in runs.values():
+            m["target_s"] = time_to_target(m, target)
+        entry: Dict[str, object] = {"id": sc.id, **sc._asdict(), "target": target,
+                                    "target_proven": proven, **runs}
+        results.append(entry)
+        if verbose:
+            print(_row(entry))
+    return {"meta": {"seed": seed, "budget": budget, "n": n,
+                     "python": platform.python_version(), "machine": platform.machine(),
+                     "created": datetime.datetime.now().isoformat(timespec="seconds")},
+            "scenarios": results}
+
+
+def _fmt(x, spec: str) -> str:
+    return "-" if x is None else format(x, spec)
+
+
+def _row(entry: Dict[str, object]) -> str:
+    cells = [f"{entry['id']:<14} doel {_fmt(entry['target'], '>5')}{'*' if entry['target_proven'] else ' '}"]
+    for solver in ("generator", "legacy"):
+        m = entry.get(solver)
+        if m is None:
+            continue
+        best = m["top_scores"][0] if m["top_scores"] else None
+        cells.append(f"{solver[:3]}: {_fmt(m['attempts_per_sec'], '>8.0f')}/s "
+                     f"eerste {_fmt(m['first_valid_s'], '>6.3f')}s doel {_fmt(m['target_s'], '>6.3f')}s "
+                     f"beste {_fmt(best, '>5')}")
+    return " | ".join(cells)
+
+
+def compare(old: Dict[str, object], new: Dict[str, object]) -> None:
+    """Per scenario: verhouding pogingen/s en verschil in beste score (nieuw − oud)."""
+    before = {e["id"]: e for e in old["scenarios"]}
+    for entry in new["scenarios"]:
+        prev = before.get(entry["id"])
+        if prev is None:
+            continue
+        cells = [f"{entry['id']:<14}"]
+        for solver in ("generator", "legacy"):
+            a, b = prev.get(solver), entry.get(solver)
+            if not a or not b:
+                continue
+            speed = b["attempts_per_sec"] / a["attempts_per_sec"] if a["attempts_per_sec"] else None
+            best_a = a["top_scores"][0] if a["top_scores"] else None
+            best_b = b["top_scores"][0] if b["top_scores"] else None
+            delta = best_b - best_a if best_a is not None and best_b is not None else None
+            cells.append(f"{solver[:3]}: ×{_fmt(speed, '.2f')} pogingen/s, beste {_fmt(delta, '+d')}")
+        print(" | ".join(cells))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark van de zitplan-solvers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--densities", type=float, nargs="+", default=list(DENSITIES))
+    parser.add_argument("--prefs", type=int, nargs="+", default=list(PREF_COUNTS))
+    parser.add_argument("--budget", type=float, default=1.0, help="Seconden per solver per klas")
+    parser.add_argument("--n", type=int, default=10, help="Grootte van de top-N")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-legacy", action="store_true", help="Sla Klasplaatsen.generate_seating over")
+    parser.add_argument("--out", default=None, help="Schrijf de baseline naar dit JSON-bestand")
+    parser.add_argument("--compare", default=None, help="Vergelijk met een eerdere baseline")
+    args = parser.parse_args(argv)
+
+    scenarios = [Scenario(*x) for x in itertools.product(args.sizes, args.densities, args.prefs)]
+    result = run(scenarios, seed=args.seed, budget=args.budget, n=args.n, legacy=not args.no_legacy)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            print()
+            compare(json.load(fh), result)
+
+
+if __name__ == "__main__":
+    main()
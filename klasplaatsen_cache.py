@@ -0,0 +1,180 @@
+# klasplaatsen_cache.py
+"""Lokale cache voor zitplannen
+----------------------------
+*   Sleutel = sha256 van de genormaliseerde klas: namen, verboden groepjes,
+    voorkeuren, ``avoid_mixed``, seed en lokaal (volgorde van namen en
+    groepjes speelt geen rol).  Het budget zit **niet** in de sleutel.
+*   Waarde = de top-N (indeling, score, uitleg) plus het aantal herstarts
+    dat er al in zit, als één JSON-bestand per sleutel.
+*   Zelfde vraag ⇒ meteen het antwoord.  Groter budget (of grotere N) ⇒
+    verder zoeken vanaf de bewaarde top-N, enkel met de ontbrekende pogingen.
+*   De map blijft onder ``max_bytes``: de langst niet gebruikte bestanden
+    (mtime) verdwijnen eerst.
+
+Gebruik
+~~~~python
+cache = SeatingCache()
+key = roster_key(roster, avoid_mixed=False, seed=42)
+best = cache.generate(gen, key, n=10)
+~~~~
+"""
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+from klasplaatsen2 import DEFAULT_ROOM, Candidate, CandidatePool, RoomLayout, Roster, SeatingGenerator
+
+CACHE_VERSION = 1   # ophogen als de score of het bestandsformaat verandert
+DEFAULT_DIR = Path(os.environ.get("KLASPLAATSEN_CACHE", Path.home() / ".cache" / "klasplaatsen"))
+DEFAULT_MAX_BYTES = 20_000_000
+
+
+class CacheEntry(NamedTuple):
+    n: int
+    attempts: int                 # herstarts die in deze top-n verwerkt zijn
+    candidates: List[Candidate]
+
+
+# ------------------------------------------------------------
+# 1. Sleutel
+# ------------------------------------------------------------
+
+def roster_key(roster: Roster, *, avoid_mixed: bool, seed: Optional[Union[int, str]],
+               room: RoomLayout = DEFAULT_ROOM) -> str:
+    groups = sorted({tuple(sorted(set(g))) for g in roster.forbidden_groups if len(set(g)) > 1})
+    config = {
+        "versie": CACHE_VERSION,
+        "jongens": sorted(roster.boys),
+        "meisjes": sorted(roster.girls),
+        "verboden": groups,
+        "solo": sorted(set(roster.solo)),
+        "back": sorted(set(roster.back)),
+        "front": sorted(set(roster.front)),
+        "avoid_mixed": bool(avoid_mixed),
+        "seed": seed,
+        "lokaal": [room.rows, room.cols, room.bank_size, [v.__name__ for v in room.variants]],
+    }
+    blob = json.dumps(config, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def resume_point(entry: Optional[CacheEntry], n: int, attempts: int,
+                 gen: Optional[SeatingGenerator] = None) -> Tuple[List[Candidate], int]:
+    """(startopstellingen, resterende herstarts) voor een vraag naar top-*n* na
+    *attempts* herstarts.  0 resterend = de cache volstaat.  Een kleinere
+    bewaarde N telt niet als gezocht: die top-n mist mogelijk plannen.
+
+    Met *gen* worden de bewaarde opstellingen eerst opnieuw gecontroleerd en
+    gescoord: de sleutel dekt niet elke regel (``apart``, ``together``,
+    ``pinned``).  Valt er één weg, dan telt niets als gezocht."""
+    if entry is None:
+        return [], attempts
+    candidates = entry.candidates
+    if gen is not None:
+        pool = CandidatePool(max(1, len(candidates)))
+        gen._seed_pool(pool, candidates)
+        if len(pool) < len(candidates):
+            return gen._candidates(pool), attempts
+        candidates = gen._candidates(pool)
+    done = entry.attempts if entry.n >= n else 0
+    return candidates, max(0, attempts - done)
+
+
+# ------------------------------------------------------------
+# 2. Opslag
+# ------------------------------------------------------------
+
+class SeatingCache:
+    def __init__(self, directory: Union[str, Path] = DEFAULT_DIR, *, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            entry = CacheEntry(data["n"], data["attempts"], [
+                ({(r, c, side): name for r, c, side, name in cand["plaatsen"]},
+                 cand["score"], cand["niet_voldaan"])
+                for cand in data["opstellingen"]])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            with contextlib.suppress(OSError):
+                path.unlink(missing_ok=True)  # kapot of oud formaat: weg ermee
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)                    # LRU: recent gebruikt
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        data = {"n": entry.n, "attempts": entry.attempts, "opstellingen": [
+            {"score": score, "niet_voldaan": missing,
+             "plaatsen": [[*seat, name] for seat, name in sorted(assign.items())]}
+            for assign, score, missing in entry.candidates]}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # eerst naar een tijdelijk bestand: een ander proces leest nooit een half bestand
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False)
+        os.replace(tmp, self._path(key))
+        self.evict(keep=self._path(key))
+
+    def evict(self, *, keep: Optional[Path] = None) -> None:
+        """Verwijder de langst niet gebruikte bestanden tot de map onder ``max_bytes``
+        zit; *keep* (het net geschreven bestand) blijft altijd staan."""
+        files = []
+        for path in self.directory.glob("*.json"):
+            try:
+                info = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((info.st_mtime, info.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for path in self.directory.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    # ---------- zoeken met cache ----------
+    def record(self, key: str, gen: SeatingGenerator, n: int, attempts: int, remaining: int,
+               best: List[Candidate]) -> None:
+        """Bewaar *best* na een zoektocht van *remaining* van de *attempts*
+        herstarts (zie ``resume_point``).  Stopte ``gen`` op ``time_limit``,
+        dan telt enkel wat echt gedaan is: een volgende vraag zoekt dan verder.
+        Lukt schrijven niet (bv. alleen-lezen schijf), dan gewoon geen cache."""
+        timed_out = gen.time_limit is not None and gen.stats.elapsed >= gen.time_limit
+        done = attempts - remaining + (gen.stats.restarts if timed_out else remaining)
+        with contextlib.suppress(OSError):
+            self.put(key, CacheEntry(n, done, best))
+
+    def generate(self, gen: SeatingGenerator, key: str, n: int = 10, *, workers: int = 1) -> List[Candidate]:
+        """``gen.generate_candidates(n)`` met ``gen.max_attempts`` als budget, maar
+        enkel voor de herstarts die de cache nog niet heeft."""
+        start, remaining = resume_point(self.get(key), n, gen.max_attempts, gen)
+        if not remaining:
+            return start[:n]
+        attempts = gen.max_attempts
+        gen.max_attempts = remaining
+        try:
+            best = gen.generate_candidates(n, workers=workers, start=start)
+        finally:
+            gen.max_attempts = attempts
+        self.record(key, gen, n, attempts, remaining, best)
+        return best
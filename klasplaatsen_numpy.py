@@ -0,0 +1,94 @@
+# klasplaatsen_numpy.py
+"""Veel zitplannen tegelijk scoren met NumPy
+-----------------------------------------
+*   Een plan is een rij van een 2-D array (plannen × stoelen) met per stoel
+    leerling-id + 1 (0 = lege stoel), net als ``Plan``-bytes uit
+    ``klasplaatsen2``.
+*   ``score_tables(gen)`` zet de scoretabellen van één generator één keer om
+    naar arrays; ``batch_scores(plans, tables)`` telt dan alles op met
+    array-operaties.  Het resultaat is exact ``SeatingGenerator._evaluate``,
+    inclusief de strafpunten voor herhaalde buren bij rotatie.
+
+Gebruik
+~~~~python
+tables = score_tables(gen)
+scores = batch_scores(plans_array(plans, len(gen.seats1)), tables)
+~~~~
+"""
+from __future__ import annotations
+
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from klasplaatsen2 import BASE_SCORE, SOLO_BONUS, Assignment, Plan, SeatingGenerator
+
+
+class ScoreTables(NamedTuple):
+    bonus: np.ndarray            # stoelen × (leerling-id + 1): front/back-bonus, kolom 0 = leeg
+    solo: np.ndarray             # leerling-id + 1 → 1 als solo-voorkeur
+    bank_seats: np.ndarray       # banken × banklengte: stoel-ids per bank
+    bank_penalty: np.ndarray     # banken × (bezetting 0..banklengte): som over alle opstellingen
+    repeat: Optional[np.ndarray]      # plat (leerlingen + 1)²: strafpunten per herhaald buurpaar
+    pairs: Optional[np.ndarray]       # buurparen × 2 (stoel s < stoel t)
+
+
+def score_tables(gen: SeatingGenerator) -> ScoreTables:
+    n, n_seats = len(gen.names), len(gen.seats1)
+    bonus = np.zeros((n_seats, n + 1), dtype=np.int64)
+    bonus[:, 1:] = np.array(gen.seat_bonus, dtype=np.int64).T
+    solo = np.zeros(n + 1, dtype=np.int64)
+    solo[1:] = gen.is_solo
+    bank_seats = np.array([[s for s in range(n_seats) if gen.seat_bank[s] == b]
+                           for b in range(len(gen.bank_penalty))], dtype=np.intp)
+    bank_penalty = np.array(gen.bank_penalty, dtype=np.int64)
+    repeat = pairs = None
+    if gen.repeat_cost is not None:
+        repeat = np.zeros((n + 1, n + 1), dtype=np.int64)
+        repeat[1:, 1:] = gen.repeat_cost
+        repeat = repeat.ravel()
+        pairs = np.array([(s, t) for s in range(n_seats) for t in gen.neighbour_seats[s] if t > s],
+                         dtype=np.intp).reshape(-1, 2)
+    return ScoreTables(bonus, solo, bank_seats, bank_penalty, repeat, pairs)
+
+
+def plans_array(plans: Sequence[Plan], n_seats: int) -> np.ndarray:
+    """``Plan``-bytes → array plannen × stoelen (zonder kopie per plan)."""
+    return np.frombuffer(b"".join(plans), dtype=np.uint8).reshape(len(plans), n_seats)
+
+
+def assignments_array(gen: SeatingGenerator, assignments: Sequence[Assignment]) -> np.ndarray:
+    """Indelingen (bv. uit ``klasplaatsen_cache``) → array plannen × stoelen."""
+    plans = np.zeros((len(assignments), len(gen.seats1)), dtype=np.intp)
+    for row, assignment in zip(plans, assignments):
+        for seat, name in assignment.items():
+            row[gen.seat_index[seat]] = gen.student_index[name] + 1
+    return plans
+
+
+def batch_scores(plans: np.ndarray, tables: ScoreTables) -> np.ndarray:
+    """Score van elk plan (rij) in *plans*; gelijk aan ``_evaluate`` per plan.
+
+    Werkt kolom per stoel en per bank: elke stap is één vectoroperatie over
+    alle plannen tegelijk (geen fancy indexing over twee assen, geen sommen
+    over korte assen; die zijn in NumPy trager dan een lus over 24 stoelen)."""
+    plans = np.asarray(plans)
+    n_seats, n_students = tables.bonus.shape
+    if plans.ndim != 2 or plans.shape[1] != n_seats:
+        raise ValueError(f"Verwacht een array plannen × {n_seats} stoelen, niet {plans.shape}.")
+    cols = np.ascontiguousarray(plans.T, dtype=np.intp)    # stoel → leerling-id + 1 per plan
+    scores = np.full(len(plans), BASE_SCORE, dtype=np.int64)
+    for s in range(n_seats):
+        scores += tables.bonus[s].take(cols[s])
+    for b, seats in enumerate(tables.bank_seats):
+        count = (cols[seats[0]] > 0).astype(np.intp)
+        solo = tables.solo.take(cols[seats[0]])
+        for s in seats[1:]:
+            count += cols[s] > 0
+            solo += tables.solo.take(cols[s])
+        scores += tables.bank_penalty[b].take(count)
+        scores += SOLO_BONUS * solo * (count == 1)
+    if tables.repeat is not None:
+        for s, t in tables.pairs:
+            scores -= tables.repeat.take(cols[s] * n_students + cols[t])
+    return scores
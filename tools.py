@@ -4,8 +4,9 @@ from veeltermen import derdegraad_benadering, vierdegraad_benadering
 import tempfile
 import os
 import urllib.parse
-from collections import defaultdict, Counter
-from klasplaatsen2 import SeatingGenerator, map_to_layout2
+from collections import defaultdict
+from klasplaatsen2 import InfeasibleError, SeatingGenerator, build_roster, parse_roster_fields, roster_text
+from klasplaatsen_cache import SeatingCache, resume_point, roster_key
 import random
 import argparse
 import streamlit.components.v1 as components
@@ -423,13 +424,13 @@ if tool == "Klasplaatsen generator":
         if uploaded_file:
             content = uploaded_file.read().decode("utf-8")
             try:
-                blokken = dict(line.split(":", 1) for line in content.splitlines() if ":" in line)
-                jongens_txt = blokken.get("jongens", "")
-                meisjes_txt = blokken.get("meisjes", "")
-                verboden_txt = blokken.get("verboden", "")
-                solo_txt = blokken.get("solo", "")
-                back_txt = blokken.get("back", "")
-                front_txt = blokken.get("front", "")
+                blokken = parse_roster_fields(content)
+                jongens_txt = blokken["jongens"]
+                meisjes_txt = blokken["meisjes"]
+                verboden_txt = blokken["verboden"]
+                solo_txt = blokken["solo"]
+                back_txt = blokken["back"]
+                front_txt = blokken["front"]
                 st.success("Invoerbestand succesvol geladen.")
             except Exception as e:
                 st.error(f"Fout bij inlezen bestand: {e}")
@@ -468,18 +469,17 @@ if tool == "Klasplaatsen generator":
         avoid_mixed = st.checkbox("Vermijd duo’s jongen + meisje", value=False)
         n_layouts = 15
         seed = random.randint(1, 10000)
-        aantal_pogingen = st.number_input("Aantal combinaties om te proberen (minstens 10000)", min_value=10000, max_value=1000000, value=100000, step=10000)
+        auto_pogingen = st.checkbox("Aantal combinaties automatisch bepalen (geschat uit een korte steekproef)", value=True)
+        if auto_pogingen:
+            aantal_pogingen = None
+        else:
+            aantal_pogingen = st.number_input("Aantal combinaties om te proberen (minstens 10000)", min_value=10000, max_value=1000000, value=100000, step=10000)
+        max_seconden = st.number_input("Maximale rekentijd in seconden (daarna krijg je de beste opstellingen tot dan)", min_value=1, max_value=120, value=10, step=1)
+        periodes = st.number_input("Aantal periodes (meer dan 1: één opstelling per periode, telkens zoveel mogelijk nieuwe buren; rekentijd geldt per periode)", min_value=1, max_value=12, value=1, step=1)
 
         # Exportknop
 
-        invoertekst = "\n".join([
-            f"jongens:{jongens_txt}\n",
-            f"meisjes:{meisjes_txt}\n",
-            f"verboden:{verboden_txt}\n",
-            f"solo:{solo_txt}\n",
-            f"back:{back_txt}\n",
-            f"front:{front_txt}\n"
-        ])
+        invoertekst = roster_text(jongens_txt, meisjes_txt, verboden_txt, solo_txt, back_txt, front_txt)
         st.markdown("""
             Je kan je instellingen eventueel downloaden zodat je de volgende keer hieruit kan kopiëren. Dan moet je alle namen niet meer intypen.
             """)
@@ -490,77 +490,88 @@ if tool == "Klasplaatsen generator":
 
         if st.button("Genereer klasplaatsen"):
             # ----- parsing ---------------------------------------------------
-            boys = [x.strip() for x in jongens_txt.split(",") if x.strip()]
-            girls = [x.strip() for x in meisjes_txt.split(",") if x.strip()]
-            names = boys + girls
-
-            # duplicates?
-            dupes = [n for n, cnt in Counter(names).items() if cnt > 1]
-            if dupes:
-                st.error(f"Dubbele namen in leerlingenlijst. Zorg dat elke naam uniek is (bv afkorting achternaam toevoegen): {', '.join(dupes)}")
-                st.stop()
-
-
-            # helper om losse lijsten te maken
-            def split_csv(txt):
-                return [x.strip() for x in txt.split(",") if x.strip()]
-
-
-            def split_groups(txt):
-                return [split_csv(line) for line in txt.strip().splitlines() if line.strip()]
-
-
-            forbidden_groups = split_groups(verboden_txt)
-            solo = split_csv(solo_txt)
-            back = split_csv(back_txt)
-            front = split_csv(front_txt)
-
-            # onbekende namen verzamelen
-            unknown = set()
-            for lst in forbidden_groups + [solo, back, front]:
-                unknown.update([n for n in lst if n not in names])
-            if unknown:
-                st.error(f"Onbekende namen: {', '.join(sorted(unknown))}")
+            try:
+                roster = build_roster(jongens_txt, meisjes_txt, verboden_txt, solo_txt, back_txt, front_txt)
+            except ValueError as e:
+                st.error(str(e))
                 st.stop()
-
-            st.info(f"Klas van {len(names)} leerlingen correct ingelezen.\n Er worden {aantal_pogingen} opstellingen gecontroleerd en de "
-                    f"beste {n_layouts} worden daarna hieronder getoond.")
+            names = roster.names
 
             # ===== generator =====
-            genders = {n: "M" for n in boys}
-            genders.update({n: "V" for n in girls})
-
             rng = random.Random(int(seed))
             gen = SeatingGenerator(
                 names,
-                forbidden_groups,
-                front_pref=front,
-                back_pref=back,
-                solo_pref=solo,
-                genders=genders,
+                roster.forbidden_groups,
+                front_pref=roster.front,
+                back_pref=roster.back,
+                solo_pref=roster.solo,
+                genders=roster.genders,
                 avoid_mixed_bank=avoid_mixed,
                 rng=rng,
-                max_attempts=aantal_pogingen   # evt. groter
+                max_attempts=aantal_pogingen or 0,  # 0: zo meteen geschat
+                time_limit=max_seconden,
+                node_budget=200                 # per herstart, groeit volgens Luby
             )
 
-            # voortgangsbalk
-            progress = st.progress(0.0)
-            best = []
-            seats = gen.seats1.copy()
-            for attempt in range(gen.max_attempts):
-                rng.shuffle(seats)
-                assign = {}
-                if gen._place_recursive(0, seats, assign):
-                    score, missing = gen._evaluate(assign)
-                    best.append((assign.copy(), score, missing))
-                    best.sort(key=lambda x: x[1], reverse=True)
-                    best = best[: int(n_layouts)]
-                    if len(best) >= n_layouts and all(miss == [] for _,_,miss in best):
-                        break
-
-                if attempt % (gen.max_attempts // 1000) == 0:
-                    progress.progress((attempt + 1) / gen.max_attempts)
-            progress.empty()
+            # haalbaarheid vooraf: onmogelijke regels meteen melden, met de schuldigen
+            try:
+                for waarschuwing in gen.precheck():
+                    st.warning(waarschuwing)
+            except InfeasibleError as e:
+                st.error("Met deze regels bestaat er geen enkele geldige opstelling. "
+                         "Deze regels botsen (versoepel er minstens één):\n"
+                         + "\n".join(f"- {c}" for c in e.conflicts))
+                st.stop()
+
+            # aantal herstarts: zelf gekozen, of geschat uit de grootte van de zoekboom
+            if auto_pogingen:
+                schatting = gen.estimate_budget(n_layouts)
+                aantal_pogingen = gen.max_attempts = schatting.attempts
+            st.info(f"Klas van {len(names)} leerlingen correct ingelezen.\n Er worden {aantal_pogingen} opstellingen gecontroleerd en de "
+                    f"beste {n_layouts} worden daarna hieronder getoond.")
+            if auto_pogingen:
+                st.caption(f"Schatting uit {schatting.probes} proefzoektochten: zoekboom van ongeveer {schatting.tree_size:.2g} stappen "
+                           f"met {schatting.plans:.2g} geldige opstellingen ({schatting.valid_rate:.0%} van de proeven geldig). "
+                           f"Kans per poging op het niveau van de beste {n_layouts}: ongeveer {schatting.hit_rate:.1%}"
+                           + (" (geen proef haalde de hoogst mogelijke score: voorzichtig geschat)"
+                              if schatting.hit_rate < schatting.top_rate else "")
+                           + f"; {aantal_pogingen} pogingen vinden die met {schatting.confidence:.0%} zekerheid.")
+
+            if periodes > 1:
+                # rotatie: per periode de beste opstelling, herhaalde buren kosten punten
+                with st.spinner(f"{periodes} periodes worden na elkaar berekend..."):
+                    try:
+                        best = gen.rotation(int(periodes)).plans
+                    except RuntimeError:
+                        best = []   # een periode vond niets binnen tijd/pogingen: zie hieronder
+                label = "Periode"
+            else:
+                # dezelfde klas al eens berekend? dan enkel de ontbrekende pogingen
+                cache = SeatingCache()
+                cache_key = roster_key(roster, avoid_mixed=avoid_mixed, seed=None)
+                start, resterend = resume_point(cache.get(cache_key), int(n_layouts), int(aantal_pogingen), gen)
+                if not resterend:
+                    best = start[:n_layouts]
+                    st.caption("Deze klas werd al eens berekend met dit aantal combinaties: resultaat uit de cache.")
+                else:
+                    gen.max_attempts = resterend
+                    # voortgangsbalk + beste score tot nu toe
+                    progress = st.progress(0.0)
+                    tussenstand = st.empty()
+
+                    def toon_voortgang(pogingen, geldig, seconden):
+                        progress.progress(min(1.0, max(pogingen / gen.max_attempts, seconden / max_seconden)))
+
+                    best = []
+                    # geen eigen vroege stop: de lus stopt zelf zodra de top de bovengrens haalt,
+                    # en de cache rekent het hele budget als doorzocht
+                    for best in gen.iter_candidates(int(n_layouts), progress=toon_voortgang, start=start):
+                        tussenstand.text(f"Beste scores tot nu toe: {', '.join(str(sc) for _, sc, _ in best)}")
+                    progress.empty()
+                    tussenstand.empty()
+                    if best:
+                        cache.record(cache_key, gen, int(n_layouts), int(aantal_pogingen), resterend, best)
+                label = "Optie"
 
             if not best:
                 st.error("Geen enkele geldige opstelling gevonden.")
@@ -587,7 +598,7 @@ if tool == "Klasplaatsen generator":
 
             # ===== output =====
             for i, (assign, sc, miss) in enumerate(best, 1):
-                st.markdown(f"### Optie {i} — score {sc}")
+                st.markdown(f"### {label} {i} — score {sc}")
                 if miss:
                     st.warning("Niet aan voorwaarden voldaan: "+ ", ".join(miss))
                 else:
@@ -595,9 +606,16 @@ if tool == "Klasplaatsen generator":
                 st.text("Opstelling 1: lokaal met 4 rijen.")
                 st.code(layout_to_str(assign, gen.seats1))
                 st.text("Opstelling 2: lokaal met 3 rijen. (laatste rij van opstelling 1 werd rechts gezet)")
-                st.code(layout_to_str({map_to_layout2(s): n for s, n in assign.items()}, gen.seats2))
+                st.code(layout_to_str(gen.variant_assignment(assign, 1), gen.variant_seats[1]))
                 st.divider()
 
+            # ===== zoekstatistieken (waarom duurde het zo lang / vond hij niets beters?) =====
+            with st.expander("Zoekstatistieken"):
+                st.text(gen.stats.summary())
+                if gen.stats.trace:
+                    st.line_chart({"beste score": {t: sc for t, sc in gen.stats.trace}})
+                st.json(gen.stats.as_dict())
+
 
 st.markdown("""---""")
 st.markdown(